@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import ChatRoom, Message
 from django.contrib.auth import get_user_model
+from core.fieldsets import SparseFieldsetMixin
 
 User = get_user_model()
 
@@ -16,7 +17,7 @@ class UserSerializer(serializers.ModelSerializer):
             return f"{obj.first_name} {obj.last_name}"
         return obj.email.split('@')[0]  # Use part of email if no name is set
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     sender_name = serializers.SerializerMethodField()
     
@@ -24,13 +25,16 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = ['id', 'sender', 'sender_name', 'content', 'created_at', 'is_read']
         read_only_fields = ['created_at']
+        field_presets = {
+            'compact': ['id', 'sender_name', 'content', 'created_at', 'is_read'],
+        }
     
     def get_sender_name(self, obj):
         if obj.sender.first_name and obj.sender.last_name:
             return f"{obj.sender.first_name} {obj.sender.last_name}"
         return obj.sender.email.split('@')[0]
 
-class ChatRoomSerializer(serializers.ModelSerializer):
+class ChatRoomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     participants = UserSerializer(many=True, read_only=True)
     last_message = serializers.SerializerMethodField()
     other_participant = serializers.SerializerMethodField()
@@ -39,6 +43,9 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         model = ChatRoom
         fields = ['id', 'participants', 'other_participant', 'created_at', 'updated_at', 'last_message']
         read_only_fields = ['created_at', 'updated_at']
+        field_presets = {
+            'compact': ['id', 'other_participant', 'updated_at', 'last_message'],
+        }
     
     def get_last_message(self, obj):
         last_message = obj.messages.last()
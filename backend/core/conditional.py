@@ -0,0 +1,152 @@
+"""
+Conditional GET support for the API views.
+
+Validators are computed from cheap database facts (the newest updated_at
+and the row count of a filtered queryset, or a single object's updated_at,
+plus the same for related rows embedded in the body) so a client polling
+an unchanged resource gets a 304 before anything is serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class Validators:
+    """ETag and optional Last-Modified for one response"""
+
+    def __init__(self, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def last_modified_timestamp(self):
+        if self.last_modified is None:
+            return None
+        return int(self.last_modified.timestamp())
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def variant(request):
+    """Parts of the request that change the body for the same rows"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+        request.build_absolute_uri(),
+        getattr(renderer, 'format', None),
+    )
+
+
+def queryset_validators(request, queryset, field='updated_at', extra=(), related_field=None):
+    """
+    Validators for a list response: one aggregate query over the filtered
+    rows. The row count is part of the ETag so deletions are noticed even
+    though they do not move max(updated_at). related_field (e.g.
+    ``user__updated_at``) adds the newest change among embedded related rows.
+    """
+    aggregates = {'last': Max(field), 'count': Count('pk')}
+    if related_field:
+        aggregates['related'] = Max(related_field)
+    stats = queryset.order_by().aggregate(**aggregates)
+    last, related = stats['last'], stats.get('related')
+    etag = make_etag(
+        variant(request), last.isoformat() if last else None, stats['count'],
+        related.isoformat() if related else None, *extra,
+    )
+    # No Last-Modified on lists: a deletion leaves max(updated_at) where it
+    # was, so If-Modified-Since alone could 304 on a changed list.
+    return Validators(etag)
+
+
+def object_validators(request, obj, field='updated_at', extra=()):
+    last = getattr(obj, field)
+    etag = make_etag(variant(request), obj._meta.label, obj.pk, last.isoformat() if last else None, *extra)
+    return Validators(etag, last)
+
+
+def fingerprint_validators(request, obj, fields):
+    """Validators for models without an updated_at column"""
+    values = tuple(getattr(obj, name) for name in fields)
+    return Validators(make_etag(variant(request), obj._meta.label, obj.pk, values))
+
+
+def not_modified(request, validators):
+    """Return a 304 response if the client's copy is current, else None"""
+    django_request = getattr(request, '_request', request)
+    return get_conditional_response(
+        django_request,
+        etag=validators.etag,
+        last_modified=validators.last_modified_timestamp,
+    )
+
+
+def add_validator_headers(response, validators):
+    response['ETag'] = validators.etag
+    if validators.last_modified is not None:
+        response['Last-Modified'] = http_date(validators.last_modified_timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified to list and retrieve responses of a DRF viewset
+    and short-circuits with 304 when the client's copy is still current.
+    """
+    validator_field = 'updated_at'
+    # updated_at of a related row the body embeds, e.g. the owner's profile
+    validator_related_field = None
+
+    def get_validator_extra(self):
+        """Extra ETag inputs for bodies that change without a row changing"""
+        return ()
+
+    def get_validator_related_field(self):
+        """validator_related_field, unless ?fields= pruned the relation"""
+        if not self.validator_related_field:
+            return None
+        relation = self.validator_related_field.split('__')[0]
+        for field in self.get_serializer().fields.values():
+            if not field.write_only and field.source_attrs[:1] == [relation]:
+                return self.validator_related_field
+        return None
+
+    def get_list_validators(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset_validators(
+            request, queryset, self.validator_field, self.get_validator_extra(),
+            self.get_validator_related_field(),
+        )
+
+    def get_object_validators(self, request, instance):
+        extra = self.get_validator_extra()
+        related_field = self.get_validator_related_field()
+        if related_field:
+            related = instance
+            for attr in related_field.split('__'):
+                related = getattr(related, attr)
+            extra = (*extra, related.isoformat() if related else None)
+        return object_validators(request, instance, self.validator_field, extra)
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_list_validators(request)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        response.validators = validators
+        return add_validator_headers(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validators = self.get_object_validators(request, instance)
+        response = not_modified(request, validators)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return add_validator_headers(Response(serializer.data), validators)
+
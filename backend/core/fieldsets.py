@@ -0,0 +1,70 @@
+"""
+Sparse fieldsets for API responses.
+
+``?fields=id,title`` limits each object to the named top-level fields and
+``?expand=user_info`` adds fields back on top of that selection, or on top
+of the default field set when ``fields`` is not given. A name in
+``fields`` may also be a preset declared on the serializer's
+``Meta.field_presets``, e.g. ``?fields=compact`` for grid views, which can
+be combined with plain names and ``expand``.
+
+Pruning happens when the serializer builds its fields, so dropped
+``SerializerMethodField``s and nested serializers are never bound or
+evaluated, and eager loading derived from the fields skips their joins.
+Only reads are pruned; writes validate against the full field set.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def selected_fields(params, available, presets):
+    """
+    Names to keep from ``available``, or None when the request names
+    neither fields nor expansions. Raises ValidationError for unknown names.
+    """
+    requested = parse_names(params.get(FIELDS_PARAM))
+    expand = parse_names(params.get(EXPAND_PARAM))
+    if not requested and not expand:
+        return None
+
+    names = []
+    for name in requested:
+        names.extend(presets.get(name, [name]))
+    for param, given in ((FIELDS_PARAM, names), (EXPAND_PARAM, expand)):
+        unknown = sorted(set(given) - set(available))
+        if unknown:
+            choices = ', '.join([*presets, *available] if param == FIELDS_PARAM else available)
+            raise ValidationError({param: f"Unknown field(s): {', '.join(unknown)}. Expected any of: {choices}."})
+    # Without ?fields= the default field set is every field
+    return set(names or available) | set(expand)
+
+
+class SparseFieldsetMixin:
+    """Applies ?fields= and ?expand= to the top-level serializer of a read"""
+
+    def is_response_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD') or not self.is_response_root():
+            return fields
+        presets = getattr(getattr(self, 'Meta', None), 'field_presets', {})
+        keep = selected_fields(request.query_params, fields, presets)
+        if keep is None:
+            return fields
+        for name in list(fields):
+            if name not in keep:
+                del fields[name]
+        return fields
@@ -0,0 +1,271 @@
+"""
+Offline geocoding and radius search for listing locations.
+
+Free-text locations are resolved against a bundled gazetteer
+(``core/data/gazetteer.csv``, overridable with ``GAZETTEER_PATH``) into a
+latitude/longitude and a geohash cell stored on the row. A ``near`` query
+first narrows rows to the handful of geohash cells covering the circle,
+using an indexed range scan on the cell column, and then checks the exact
+great-circle distance for those candidates in one NumPy pass.
+"""
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Case, FloatField, Q, Value, When
+from rest_framework.exceptions import ValidationError
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character, closing a prefix range
+CELL_RANGE_END = '{'
+CELL_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+# Cap on matches pulled for a single radius query, nearest first. Farther
+# matches are dropped; responses report this as "truncated".
+MAX_RESULTS = 1000
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.csv')
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    return ' '.join(_WORD_RE.findall((text or '').lower().replace("'", '')))
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path):
+    places = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            names = [row['name'], *(row.get('aliases') or '').split('|')]
+            for name in filter(None, map(normalize, names)):
+                places.setdefault(name, point)
+    return places
+
+
+def geocode(text):
+    """
+    Resolve free text such as "Mirpur 10, Dhaka" to ``(lat, lon)``, or None.
+
+    The whole string is tried first, then each comma-separated part in order
+    (most specific first), then the longest run of words in a part that
+    names a known place.
+    """
+    places = load_gazetteer(getattr(settings, 'GAZETTEER_PATH', DEFAULT_GAZETTEER_PATH))
+    whole = normalize(text)
+    if whole in places:
+        return places[whole]
+    for part in map(normalize, (text or '').split(',')):
+        if part in places:
+            return places[part]
+        words = part.split()
+        for size in range(len(words) - 1, 0, -1):
+            for start in range(len(words) - size + 1):
+                point = places.get(' '.join(words[start:start + size]))
+                if point:
+                    return point
+    return None
+
+
+def encode_geohash(lat, lon, precision=CELL_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        span, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (span[0] + span[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Height and width in degrees of a geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(lat, lon, radius_km):
+    """
+    Geohash prefixes whose cells cover the circle: the cell holding the
+    centre and its eight neighbours, at the finest precision whose cells are
+    still at least as large as the radius. None when the circle is wider
+    than the coarsest cells.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    # Degrees of longitude shrink towards the poles; size for the worst edge
+    edge_lat = min(abs(lat) + dlat, 89.0)
+    dlon = radius_km / (KM_PER_DEGREE * math.cos(math.radians(edge_lat)))
+
+    precision = 0
+    for candidate in range(1, CELL_PRECISION + 1):
+        height, width = cell_size(candidate)
+        if height < dlat or width < dlon:
+            break
+        precision = candidate
+    if precision == 0:
+        return None
+
+    height, width = cell_size(precision)
+    cells = set()
+    for dy in (-height, 0, height):
+        for dx in (-width, 0, width):
+            y = min(max(lat + dy, -89.999999), 89.999999)
+            x = (lon + dx + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(y, x, precision))
+    return sorted(cells)
+
+
+def cell_filter(cells):
+    """Prefix match on geo_cell written as index-friendly range conditions"""
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geo_cell__gte=cell, geo_cell__lt=cell + CELL_RANGE_END)
+    return condition
+
+
+def haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def assign_location(instance):
+    """Set latitude, longitude and geo_cell on instance from its location text"""
+    point = geocode(instance.location)
+    if point is None:
+        instance.latitude = instance.longitude = None
+        instance.geo_cell = ''
+    else:
+        instance.latitude, instance.longitude = point
+        instance.geo_cell = encode_geohash(*point)
+
+
+def nearby_matches(queryset, lat, lon, radius_km, limit=None):
+    """
+    ``(id, distance_km)`` pairs for queryset's rows within radius_km of the
+    point, nearest first, and whether more than ``limit`` (default
+    MAX_RESULTS) rows were in range. The cap applies after the queryset's
+    own filters.
+    """
+    candidates = queryset.exclude(latitude=None)
+    cells = covering_cells(lat, lon, radius_km)
+    if cells is not None:
+        candidates = candidates.filter(cell_filter(cells))
+    rows = list(candidates.order_by().values_list('pk', 'latitude', 'longitude'))
+    if not rows:
+        return [], False
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    coords = np.array([row[1:] for row in rows], dtype=np.float64)
+    distances = haversine_km(lat, lon, coords[:, 0], coords[:, 1])
+    inside = np.flatnonzero(distances <= radius_km)
+    limit = limit or MAX_RESULTS
+    nearest = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return list(zip(ids[nearest].tolist(), distances[nearest].round(3).tolist())), len(inside) > limit
+
+
+def _filter_key(queryset):
+    try:
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    return sql, tuple(params)
+
+
+def within_radius(queryset, lat, lon, radius_km, memo=None):
+    """
+    Restrict queryset to rows within radius_km and annotate ``distance_km``.
+    A memo dict reuses lookups and tells ``is_truncated`` whether any was capped.
+    """
+    key = (queryset.model, _filter_key(queryset), lat, lon, radius_km)
+    if memo is not None and key in memo:
+        matches, truncated = memo[key]
+    else:
+        if key[1] is None:
+            matches, truncated = [], False
+        else:
+            matches, truncated = nearby_matches(queryset, lat, lon, radius_km)
+        if memo is not None:
+            memo[key] = matches, truncated
+    if not matches:
+        return queryset.none().annotate(distance_km=Value(0.0, output_field=FloatField()))
+    distance = Case(
+        *[When(pk=pk, then=Value(value)) for pk, value in matches],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=[pk for pk, _ in matches]).annotate(distance_km=distance)
+
+
+def is_truncated(memo):
+    """Whether any lookup recorded in a ``within_radius`` memo hit its cap"""
+    return any(truncated for _, truncated in memo.values())
+
+
+def parse_near(params):
+    """Read ``near=lat,lon`` and ``radius_km`` from query params, or None"""
+    near = params.get('near')
+    if not near:
+        return None
+    try:
+        lat, lon = (float(part) for part in near.split(','))
+    except ValueError:
+        raise ValidationError({'near': 'Expected "lat,lon".'})
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValidationError({'near': 'Coordinates out of range.'})
+    try:
+        radius_km = float(params.get('radius_km') or DEFAULT_RADIUS_KM)
+    except ValueError:
+        raise ValidationError({'radius_km': 'Expected a number.'})
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}.'})
+    return lat, lon, radius_km
+
+
+class NearFilterMixin:
+    """``?near=lat,lon&radius_km=`` handling for viewsets over geocoded models"""
+    near = None
+    # Set when the matches were cut at MAX_RESULTS
+    results_truncated = False
+
+    def apply_near(self, queryset):
+        near = parse_near(self.request.query_params)
+        if near is None:
+            return queryset
+        self.near = near
+        memo = self.__dict__.setdefault('_near_memo', {})
+        queryset = within_radius(queryset, *near, memo=memo)
+        if is_truncated(memo):
+            self.results_truncated = True
+        return queryset
+
+
+class DistanceSerializerMixin:
+    """Adds distance_km to rows returned by a radius search"""
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        distance = getattr(instance, 'distance_km', None)
+        if distance is not None:
+            data['distance_km'] = distance
+        return data
@@ -0,0 +1,154 @@
+"""
+Serving uploaded media.
+
+Django resolves and checks the requested path, then either hands the
+transfer to the front proxy or streams the file itself, depending on
+``MEDIA_SERVE_MODE``:
+
+``'x-accel'``
+    Responds with an empty body and ``X-Accel-Redirect`` pointing at
+    ``MEDIA_ACCEL_PREFIX``. nginx needs an internal location for it::
+
+        location /protected-media/ {
+            internal;
+            alias /srv/share-and-save/backend/media/;
+        }
+
+``'sendfile'``
+    Responds with ``X-Sendfile`` set to the absolute file path
+    (Apache mod_xsendfile, lighttpd).
+
+``'django'``
+    Streams the file from Python with ``Range`` support. Meant for
+    development and for deployments without a proxy in front.
+
+Every mode sends ``ETag``, ``Last-Modified`` and ``Cache-Control`` and
+answers conditional requests with 304. Content-addressed files under
+``blobs/`` never change, so they are cached as immutable.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_BLOB_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+
+def media_etag(path, stat):
+    match = _BLOB_RE.match(path)
+    if match:
+        # The name is the content hash
+        return f'"{match.group(1)}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def cache_control(path):
+    if _BLOB_RE.match(path):
+        return 'public, max-age=31536000, immutable'
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400)}"
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` inclusive for a single byte range, None to send
+    the whole file, or False when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        # Absent, malformed or multi-range: the full body is a valid answer
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+    if not os.path.isfile(full_path):
+        raise Http404('Media file not found')
+
+    stat = os.stat(full_path)
+    etag = media_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _transfer(request, path, full_path, stat.st_size, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control(path)
+    return response
+
+
+def _transfer(request, path, full_path, size, etag):
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if mode == 'x-accel':
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+        return response
+    if mode == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and etag not in parse_etags(if_range):
+        # The client's partial copy is outdated; send everything
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(full_path, start, end - start + 1),
+        status=206, content_type=content_type,
+    )
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,66 @@
+"""
+JSON rendering with orjson.
+
+``FastJSONRenderer`` produces the same JSON as DRF's ``JSONRenderer`` for
+the API's default settings (compact separators, unescaped unicode) while
+encoding in C. Types orjson does not handle natively, such as dates and
+decimals, go through DRF's encoder, and requests the fast encoder cannot
+match byte for byte (indentation, ASCII-only output) use the stock
+renderer. Without orjson installed it is the stock renderer.
+
+The bytes are the same except for floats written with an exponent, which
+orjson spells shorter (``1e16`` and ``1e-7`` rather than ``1e+16`` and
+``1e-07``); they parse to the same values. orjson writes NaN and infinity
+as ``null``, so data holding them goes to the stock renderer, which
+rejects them like any other response.
+"""
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+
+if orjson is not None:
+    # Dates and times keep DRF's formatting (trimmed microseconds, 'Z')
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+        try:
+            ret = orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # Values only the stdlib encoder accepts, e.g. integers over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping JSONRenderer applies for JavaScript compatibility
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def has_non_finite(data):
+    """Whether data holds a NaN or infinite float, which orjson writes as null"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
@@ -167,6 +167,42 @@ DISCOUNT_PRODUCTS_DIR = os.path.join(MEDIA_ROOT, 'discount_products')
 if not os.path.exists(DISCOUNT_PRODUCTS_DIR):
     os.makedirs(DISCOUNT_PRODUCTS_DIR)
 
+# How media files reach the client (see core/media.py): 'django' streams
+# them from Python, 'x-accel' hands off to nginx through the internal
+# MEDIA_ACCEL_PREFIX location, 'sendfile' sets X-Sendfile.
+MEDIA_SERVE_MODE = 'django'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Cache lifetime for media other than content-addressed blobs, which are
+# cached as immutable
+MEDIA_CACHE_MAX_AGE = 86400
+
+# Budgets for listing image uploads, checked while the upload streams in
+# (see products/uploads.py)
+LISTING_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+LISTING_IMAGE_MAX_PIXELS = 24_000_000
+
+# Upper bound on listings accepted by one POST to a <listing>/bulk/ endpoint
+BULK_CREATE_MAX_ITEMS = 50
+
+# Upper bound on operations accepted by one POST to cart/sync/ (see
+# products/cart.py); the whole batch runs in one transaction
+CART_SYNC_MAX_OPERATIONS = 100
+
+# Listing images are stored once per distinct content under media/blobs/
+# (see products/storage.py); run `manage.py dedupe_media` to fold files
+# uploaded before this into that layout.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'listing_images': {
+        'BACKEND': 'products.storage.ContentAddressedStorage',
+    },
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -183,6 +219,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    # JSONRenderer's output, encoded with orjson when installed (see
+    # core/renderers.py for how exponent floats are spelled)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
@@ -190,6 +232,35 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache backend; listing responses are cached per filter combination and
+# invalidated by generation counters bumped from products/signals.py
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'share-and-save',
+    }
+}
+
+# Upper bound (seconds) on how stale a cached listing page can get, e.g.
+# for owner reputation shown inside listings
+LISTING_CACHE_TIMEOUT = 60
+
+# Fraction of listing requests that log per-filter row counts (see
+# products/diagnostics.py). Staff can also opt in with ?debug=listing.
+LISTING_DIAGNOSTICS_SAMPLE_RATE = 0.0
+
+# Build plain listing pages from .values() rows instead of the serializers
+# (products/fastpath.py); the output is identical either way
+LISTING_FAST_PATH = True
+
+# Rows fetched per database round trip by the streaming exports
+# (core/exports.py)
+EXPORT_CHUNK_SIZE = 2000
+
+# Generate listing image variants on a background thread after upload.
+# When False they are built inline once the saving transaction commits.
+IMAGE_VARIANTS_ASYNC = True
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -224,5 +295,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'products.diagnostics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
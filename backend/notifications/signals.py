@@ -17,26 +17,36 @@ def create_food_notification(sender, instance, created, **kwargs):
     
     if created:
         logger.info(f"Creating notifications for new food item: {instance.title}")
-        # Create notifications for all users except the creator
-        users = User.objects.exclude(id=instance.user.id)
-        logger.info(f"Found {users.count()} users to notify")
-        
-        notifications = [
-            Notification(
-                user=user,
-                type='food',
-                message=f'New food item added: {instance.title}',
-                related_item_id=instance.id
-            )
-            for user in users
-        ]
-        
-        try:
-            created_notifications = Notification.objects.bulk_create(notifications)
-            logger.info(f"Successfully created {len(created_notifications)} notifications")
-        except Exception as e:
-            logger.error(f"Error creating notifications: {str(e)}")
-            raise
+        notify_new_food_items(instance.user, [instance])
+
+def notify_new_food_items(owner, items):
+    """
+    Tell every other user about newly listed food. A batch of items sends
+    one notification per user, pointing at the first item.
+    """
+    users = User.objects.exclude(id=owner.id)
+    logger.info(f"Found {users.count()} users to notify")
+
+    if len(items) == 1:
+        message = f'New food item added: {items[0].title}'
+    else:
+        message = f'{len(items)} new food items added: {items[0].title} and more'
+    notifications = [
+        Notification(
+            user=user,
+            type='food',
+            message=message[:255],
+            related_item_id=items[0].id
+        )
+        for user in users
+    ]
+
+    try:
+        created_notifications = Notification.objects.bulk_create(notifications)
+        logger.info(f"Successfully created {len(created_notifications)} notifications")
+    except Exception as e:
+        logger.error(f"Error creating notifications: {str(e)}")
+        raise
 
 @receiver(post_delete, sender=FoodItem)
 def delete_food_notifications(sender, instance, **kwargs):
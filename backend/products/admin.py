@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FoodItem, FreeProduct, DiscountProduct
+from .models import FoodItem, FreeProduct, DiscountProduct, MediaBlob, Transaction
 
 @admin.register(FoodItem)
 class FoodItemAdmin(admin.ModelAdmin):
@@ -20,4 +20,17 @@ class DiscountProductAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'condition', 'original_price', 'discount_price', 'location', 'user', 'is_available', 'created_at')
     list_filter = ('category', 'condition', 'is_available', 'created_at')
     search_fields = ('title', 'description', 'location')
-    date_hierarchy = 'created_at' 
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'created_at')
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+    list_display = ('title', 'item_type', 'price', 'quantity', 'buyer', 'seller', 'payment_method', 'created_at')
+    list_filter = ('item_type', 'payment_method', 'created_at')
+    search_fields = ('title', 'buyer__email', 'seller__email')
+    date_hierarchy = 'created_at'
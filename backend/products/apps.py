@@ -6,4 +6,7 @@ class ProductsConfig(AppConfig):
     name = 'products'
     
     def ready(self):
-        import products.signals
\ No newline at end of file
+        import products.signals
+        from django.db.models.signals import post_migrate
+        from .search import reset_fts_cache
+        post_migrate.connect(reset_fts_cache, dispatch_uid='products_reset_fts_cache')
\ No newline at end of file
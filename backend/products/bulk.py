@@ -0,0 +1,120 @@
+"""
+Bulk listing creation.
+
+``bulk_create`` skips the model signals, so ``create_listings`` does their
+work once per batch instead of once per row: geocoding and image uploads
+before the insert, then a single search-index write, one aggregated
+reputation award, one notification fan-out and one cache invalidation.
+Uploads happen inside the batch's transaction, so a failed batch also
+rolls back the image references it took.
+"""
+import json
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core import geo
+from users.utils import award_many, get_reputation_points_for_action
+from .models import FoodItem
+from . import images, listing_cache, search
+
+logger = logging.getLogger(__name__)
+
+ITEM_LABELS = {'food': 'food item', 'free': 'free product', 'discount': 'discount product'}
+
+
+def get_max_items():
+    return getattr(settings, 'BULK_CREATE_MAX_ITEMS', 50)
+
+
+def parse_items(request):
+    """
+    Read the ``items`` list from a JSON body or a multipart form. In a form,
+    ``items`` is a JSON string and an item's ``image`` names the file part
+    holding its upload.
+    """
+    items = request.data.get('items')
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except ValueError:
+            raise ValidationError({'items': 'Expected a JSON list of items.'})
+    if not isinstance(items, list) or not items:
+        raise ValidationError({'items': 'Expected a non-empty list of items.'})
+    if len(items) > get_max_items():
+        raise ValidationError({'items': f'At most {get_max_items()} items can be created at once.'})
+
+    resolved = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValidationError({'items': 'Each item must be an object.'})
+        item = dict(item)
+        file_name = item.get('image')
+        if isinstance(file_name, str) and file_name:
+            if file_name not in request.FILES:
+                raise ValidationError({'items': f'No uploaded file named "{file_name}".'})
+            item['image'] = request.FILES[file_name]
+        resolved.append(item)
+    return resolved
+
+
+def prepare_listing(model, user, data):
+    """Build an unsaved listing the way the serializer's create() would"""
+    data = dict(data)
+    image = data.pop('image', None)
+    if model is FoodItem:
+        if data.get('is_free'):
+            data['price'] = None
+    else:
+        data['is_available'] = True
+    instance = model(user=user, **data)
+    geo.assign_location(instance)
+    if image:
+        instance.image.save(image.name, image, save=False)
+    return instance
+
+
+def create_listings(model, kind, user, validated_items):
+    with transaction.atomic():
+        instances = [prepare_listing(model, user, data) for data in validated_items]
+        instances = model.objects.bulk_create(instances)
+        search.index_listings(instances)
+        award_listing_reputation(user, kind, instances)
+        if model is FoodItem:
+            from notifications.signals import notify_new_food_items
+            notify_new_food_items(user, instances)
+        transaction.on_commit(partial(listing_cache.bump_generation, kind))
+        for instance in instances:
+            if instance.image:
+                images.schedule_variants(instance)
+    logger.info(f"Bulk created {len(instances)} {ITEM_LABELS[kind]}s for {user}")
+    return instances
+
+
+def award_listing_reputation(user, kind, instances):
+    label = ITEM_LABELS[kind]
+    points = get_reputation_points_for_action('item_shared')
+    awards = [
+        {
+            'user': user,
+            'action': 'item_shared',
+            'points': points,
+            'description': f"Shared {label}: {instance.title}",
+            'related_item_id': instance.id,
+            'related_item_type': kind,
+        }
+        for instance in instances
+    ]
+    if user.total_items_shared == 0:
+        awards.append({
+            'user': user,
+            'action': 'first_listing',
+            'points': get_reputation_points_for_action('first_listing'),
+            'description': "First item shared on Share&Save!",
+            'related_item_id': instances[0].id,
+            'related_item_type': kind,
+        })
+    award_many(awards)
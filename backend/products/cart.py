@@ -0,0 +1,306 @@
+"""
+Cart writes.
+
+Adding an item that is already in the cart adds to its quantity. On SQLite
+and PostgreSQL that is a single ``INSERT ... ON CONFLICT DO UPDATE``
+statement, so parallel "add to cart" requests neither lose increments nor
+trip the (user, item_type, item_id) unique constraint. Other backends use
+an ``F()`` increment with an insert fallback.
+
+``sync`` applies an ordered batch of add/update/remove operations from the
+client in one transaction. The operations are replayed against the cart in
+memory and the net change is written with at most one DELETE, one bulk
+INSERT and one bulk UPDATE.
+
+``revalidate`` checks cart lines against the live listings with one ``IN``
+query per item type, copies changed titles, prices and images back onto
+the lines in one bulk UPDATE and flags lines whose listing is gone, sold or
+expired. ``cart_total`` sums the available lines in one aggregate.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import expiry
+from .fastpath import MediaURLs
+from .models import CartItem, DiscountProduct, FoodItem, FreeProduct, FOOD_SORT_PRICE
+
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+CART_KEY = ('user', 'item_type', 'item_id')
+
+# Columns an add writes; the rest of the row is left alone on conflict
+ADD_FIELDS = (
+    'user', 'item_type', 'item_id', 'title', 'description', 'price', 'quantity',
+    'image_url', 'is_available', 'created_at', 'updated_at',
+)
+
+
+def add_item(user, data):
+    """
+    Put ``data['quantity']`` (default 1) of an item in user's cart.
+    Returns ``(cart_item, created)``.
+    """
+    now = timezone.now()
+    values = {
+        'user': user,
+        'item_type': data['item_type'],
+        'item_id': data['item_id'],
+        'title': data['title'],
+        'description': data['description'],
+        'price': data['price'],
+        'quantity': data.get('quantity', 1),
+        'image_url': data.get('image_url'),
+        'is_available': True,
+        'created_at': now,
+        'updated_at': now,
+    }
+    if connection.vendor in UPSERT_VENDORS:
+        item = _upsert(values)
+        # A conflicting row keeps its original created_at
+        return item, item.created_at == now
+    return _increment_or_create(values)
+
+
+def _upsert(values):
+    meta = CartItem._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    fields = [meta.get_field(name) for name in ADD_FIELDS]
+    params = [
+        field.get_db_prep_save(values[field.name].pk if field.is_relation else values[field.name], connection)
+        for field in fields
+    ]
+    columns = ', '.join(qn(field.column) for field in fields)
+    conflict = ', '.join(qn(meta.get_field(name).column) for name in CART_KEY)
+    returning = ', '.join(qn(field.column) for field in meta.concrete_fields)
+    quantity, updated_at = qn('quantity'), qn('updated_at')
+    # Adding a single item again leaves its one unit in the cart
+    new_quantity = (
+        f'EXCLUDED.{quantity}' if values['item_type'] in CartItem.SINGLE_ITEM_TYPES
+        else f'{table}.{quantity} + EXCLUDED.{quantity}'
+    )
+    sql = (
+        f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET '
+        f'{quantity} = {new_quantity}, '
+        f'{updated_at} = EXCLUDED.{updated_at} '
+        f'RETURNING {returning}'
+    )
+    # raw() applies the model's column converters to the returned row
+    return list(CartItem.objects.raw(sql, params))[0]
+
+
+def _increment_or_create(values):
+    key = {name: values[name] for name in CART_KEY}
+    quantity = values['quantity'] if values['item_type'] in CartItem.SINGLE_ITEM_TYPES else F('quantity') + values['quantity']
+    increment = {'quantity': quantity, 'updated_at': values['updated_at']}
+    with transaction.atomic():
+        if not CartItem.objects.filter(**key).update(**increment):
+            try:
+                with transaction.atomic():
+                    return CartItem.objects.create(**values), True
+            except IntegrityError:
+                # A parallel add inserted the row first
+                CartItem.objects.filter(**key).update(**increment)
+        return CartItem.objects.get(**key), False
+
+
+SYNC_OPERATIONS = ('add', 'update', 'remove', 'clear')
+# Line fields an add can change on an existing line
+LINE_FIELDS = ('title', 'description', 'price', 'image_url')
+
+
+def get_max_operations():
+    return settings.CART_SYNC_MAX_OPERATIONS
+
+
+def parse_operations(operations):
+    """
+    Validate a sync batch before anything is written. Adds are checked with
+    CartItemSerializer; update and remove name a line by ``id`` or by
+    ``item_type`` and ``item_id``.
+    """
+    from .serializers import CartItemSerializer
+
+    if not isinstance(operations, list) or not operations:
+        raise ValidationError({'operations': 'Expected a non-empty list of operations.'})
+    if len(operations) > get_max_operations():
+        raise ValidationError({'operations': f'At most {get_max_operations()} operations can be synced at once.'})
+
+    parsed, errors = [], {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in SYNC_OPERATIONS:
+            errors[index] = f"Expected an object with op one of: {', '.join(SYNC_OPERATIONS)}."
+            continue
+        op = operation['op']
+        if op == 'add':
+            serializer = CartItemSerializer(data=operation)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            data = serializer.validated_data
+            parsed.append((op, (data['item_type'], data['item_id']), data))
+        elif op == 'clear':
+            parsed.append((op, None, None))
+        else:
+            try:
+                target = _line_reference(operation)
+                quantity = int(operation['quantity']) if op == 'update' else None
+            except (KeyError, TypeError, ValueError):
+                errors[index] = 'Expected id or item_type and item_id, and a whole quantity for update.'
+                continue
+            if op == 'update' and quantity < 1:
+                errors[index] = 'Quantity must be at least 1.'
+                continue
+            parsed.append((op, target, quantity))
+    if errors:
+        raise ValidationError({'operations': errors})
+    return parsed
+
+
+def _line_reference(operation):
+    if operation.get('id') is not None:
+        return int(operation['id'])
+    return (str(operation['item_type']), int(operation['item_id']))
+
+
+def sync(user, operations):
+    """Apply parsed operations to user's cart in order; returns the cart"""
+    with transaction.atomic():
+        existing = list(CartItem.objects.select_for_update().filter(user=user))
+        lines = {(item.item_type, item.item_id): item for item in existing}
+        keys_by_id = {item.id: key for key, item in lines.items()}
+        before = {item.id: _line_state(item) for item in existing}
+
+        for index, (op, target, payload) in enumerate(operations):
+            if op == 'clear':
+                lines.clear()
+                continue
+            if op == 'add':
+                item = lines.get(target)
+                if item is None:
+                    # A line removed earlier in the batch keeps its row
+                    item = next((row for row in existing if (row.item_type, row.item_id) == target), None)
+                    if item is not None:
+                        item.quantity = 0
+                    else:
+                        item = CartItem(user=user, item_type=target[0], item_id=target[1], quantity=0)
+                    lines[target] = item
+                if target[0] in CartItem.SINGLE_ITEM_TYPES:
+                    item.quantity = 1
+                else:
+                    item.quantity += payload.get('quantity', 1)
+                for name in LINE_FIELDS:
+                    if name in payload:
+                        setattr(item, name, payload[name])
+                continue
+            key = keys_by_id.get(target) if isinstance(target, int) else target
+            if key not in lines:
+                raise ValidationError({'operations': {index: 'No such item in the cart.'}})
+            if op == 'update':
+                if key[0] in CartItem.SINGLE_ITEM_TYPES and payload > 1:
+                    raise ValidationError({'operations': {index: 'Free and discount items can only be bought one at a time.'}})
+                lines[key].quantity = payload
+            else:
+                del lines[key]
+
+        now = timezone.now()
+        kept = {item.id for item in lines.values() if item.id is not None}
+        removed = [item_id for item_id in before if item_id not in kept]
+        created = [item for item in lines.values() if item.id is None]
+        changed = [
+            item for item in lines.values()
+            if item.id is not None and _line_state(item) != before[item.id]
+        ]
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if created:
+            CartItem.objects.bulk_create(created, **_conflict_options())
+        if changed:
+            for item in changed:
+                item.updated_at = now
+            CartItem.objects.bulk_update(changed, ['quantity', *LINE_FIELDS, 'updated_at'])
+        return list(CartItem.objects.filter(user=user))
+
+
+def _line_state(item):
+    return (item.quantity, *(getattr(item, name) for name in LINE_FIELDS))
+
+
+def _conflict_options():
+    # A line added by a parallel request takes the synced state
+    if not connection.features.supports_update_conflicts_with_target:
+        return {}
+    return {
+        'update_conflicts': True,
+        'unique_fields': list(CART_KEY),
+        'update_fields': ['quantity', *LINE_FIELDS, 'updated_at'],
+    }
+
+
+# item_type -> (model, live listings, price a line is charged at)
+LISTING_SOURCES = {
+    'food': (FoodItem, expiry.active_food, FOOD_SORT_PRICE),
+    'free': (FreeProduct, lambda queryset: queryset.filter(is_available=True), Value(0)),
+    'discount': (DiscountProduct, lambda queryset: queryset.filter(is_available=True), F('discount_price')),
+}
+
+# Line fields refreshed from the listing
+REVALIDATED_FIELDS = ('title', 'description', 'price', 'image_url', 'is_available')
+
+
+def live_listings(item_type, item_ids, request=None):
+    """``{id: line values}`` for the listings of item_type that can still be bought"""
+    model, available, price = LISTING_SOURCES[item_type]
+    rows = available(model.objects.filter(pk__in=item_ids)).order_by().values(
+        'id', 'title', 'description', 'image', live_price=price,
+    )
+    urls = MediaURLs(request, model._meta.get_field('image').storage) if request is not None else None
+    listings = {}
+    for row in rows:
+        values = {'title': row['title'], 'description': row['description'], 'price': row['live_price']}
+        if urls is not None:
+            values['image_url'] = urls.url(row['image']) if row['image'] else None
+        listings[row['id']] = values
+    return listings
+
+
+def revalidate(items, request=None):
+    """
+    Bring cart lines in line with their listings: one query per item type
+    and one bulk UPDATE for the lines that changed. Image URLs are only
+    refreshed when a request is given to build them. Returns the lines.
+    """
+    items = list(items)
+    ids_by_type = {}
+    for item in items:
+        ids_by_type.setdefault(item.item_type, set()).add(item.item_id)
+    listings = {
+        item_type: live_listings(item_type, item_ids, request)
+        for item_type, item_ids in ids_by_type.items()
+        if item_type in LISTING_SOURCES
+    }
+
+    now = timezone.now()
+    changed = []
+    for item in items:
+        values = listings.get(item.item_type, {}).get(item.item_id)
+        updates = {'is_available': values is not None, **(values or {})}
+        if any(getattr(item, name) != value for name, value in updates.items()):
+            for name, value in updates.items():
+                setattr(item, name, value)
+            item.updated_at = now
+            changed.append(item)
+    if changed:
+        CartItem.objects.bulk_update(changed, [*REVALIDATED_FIELDS, 'updated_at'])
+    return items
+
+
+def cart_total(user):
+    """What the user's available lines cost, summed in the database"""
+    return CartItem.objects.filter(user=user, is_available=True).aggregate(
+        total=Coalesce(Sum(F('price') * F('quantity')), Value(0), output_field=IntegerField()),
+    )['total']
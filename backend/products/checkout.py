@@ -0,0 +1,130 @@
+"""
+Checkout.
+
+``checkout`` turns a user's cart into one ``Transaction`` per line inside a
+single database transaction. The cart and the listings it names are locked
+up front and every write is a bulk statement, so the number of queries
+depends on how many item types the cart holds, never on how many lines:
+one locked read per item type, one UPDATE per sold-out type marking free
+and discount listings unavailable, one INSERT of transactions, one INSERT
+of reputation history, one UPDATE of buyer and seller counters and one
+DELETE of the cart lines.
+"""
+import logging
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from users.utils import award_many, get_reputation_points_for_action
+from . import listing_cache
+from .cart import LISTING_SOURCES
+from .models import CartItem, Transaction
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_METHODS = [value for value, _ in Transaction.PAYMENT_METHOD_CHOICES]
+
+
+class CheckoutError(Exception):
+    """Some cart lines cannot be bought as they are; nothing was written"""
+
+    def __init__(self, unavailable, message='Some items in your cart can no longer be bought.'):
+        super().__init__(message)
+        self.unavailable = unavailable
+
+
+def parse_payment_method(value):
+    if value not in PAYMENT_METHODS:
+        raise ValidationError({'payment_method': f"Expected one of: {', '.join(PAYMENT_METHODS)}."})
+    return value
+
+
+def checkout(buyer, payment_method):
+    """
+    Buy everything in buyer's cart at the listings' current prices. Returns
+    the created transactions; raises CheckoutError when a line's listing is
+    gone, sold, expired or the buyer's own, or a single item's line holds
+    more than one unit.
+    """
+    with transaction.atomic():
+        items = list(CartItem.objects.select_for_update().filter(user=buyer).order_by('pk'))
+        if not items:
+            raise ValidationError({'cart': 'Your cart is empty.'})
+        oversold = [
+            item.id for item in items
+            if item.item_type in CartItem.SINGLE_ITEM_TYPES and item.quantity > 1
+        ]
+        if oversold:
+            raise CheckoutError(oversold, 'Free and discount items can only be bought one at a time.')
+
+        ids_by_type = {}
+        for item in items:
+            ids_by_type.setdefault(item.item_type, set()).add(item.item_id)
+        listings = {
+            item_type: _lock_listings(item_type, item_ids, buyer)
+            for item_type, item_ids in ids_by_type.items()
+            if item_type in LISTING_SOURCES
+        }
+        unavailable = [
+            item.id for item in items
+            if item.item_id not in listings.get(item.item_type, {})
+        ]
+        if unavailable:
+            raise CheckoutError(unavailable)
+
+        now = timezone.now()
+        # Single items are sold once and then taken off the market
+        for item_type in CartItem.SINGLE_ITEM_TYPES:
+            if listings.get(item_type):
+                model = LISTING_SOURCES[item_type][0]
+                model.objects.filter(pk__in=listings[item_type]).update(is_available=False, updated_at=now)
+                transaction.on_commit(partial(listing_cache.bump_generation, item_type))
+
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                buyer=buyer,
+                seller_id=listings[item.item_type][item.item_id]['user_id'],
+                item_type=item.item_type,
+                item_id=item.item_id,
+                title=listings[item.item_type][item.item_id]['title'],
+                price=listings[item.item_type][item.item_id]['live_price'],
+                quantity=item.quantity,
+                payment_method=payment_method,
+            )
+            for item in items
+        ])
+        _award_parties(buyer, transactions)
+        CartItem.objects.filter(pk__in=[item.id for item in items]).delete()
+
+    logger.info(f"Checked out {len(transactions)} cart items for {buyer}")
+    return transactions
+
+
+def _lock_listings(item_type, item_ids, buyer):
+    """``{id: row}`` for the listings still for sale, locked until commit"""
+    model, available, price = LISTING_SOURCES[item_type]
+    rows = available(model.objects.filter(pk__in=item_ids)).exclude(user=buyer).select_for_update()
+    return {
+        row['id']: row
+        for row in rows.order_by('pk').values('id', 'user_id', 'title', live_price=price)
+    }
+
+
+def _award_parties(buyer, transactions):
+    """The buyer receives each item and each seller completes a transaction"""
+    received = get_reputation_points_for_action('item_received')
+    completed = get_reputation_points_for_action('transaction_completed')
+    events = []
+    for sale in transactions:
+        related = {'related_item_id': sale.item_id, 'related_item_type': sale.item_type}
+        events.append({
+            'user': buyer, 'action': 'item_received', 'points': received,
+            'description': f"Received: {sale.title}", **related,
+        })
+        events.append({
+            'user_id': sale.seller_id, 'action': 'transaction_completed', 'points': completed,
+            'description': f"Completed transaction: {sale.title}", **related,
+        })
+    award_many(events)
@@ -0,0 +1,52 @@
+"""
+Opt-in diagnostics for listing querysets.
+
+Counting rows after every filter and logging each returned row helps when
+chasing a filtering bug, but every step is an extra query. These stats are
+collected only for requests that ask for them, either through
+``?debug=listing`` (staff users, or anyone when ``DEBUG`` is on) or through
+sampling at ``LISTING_DIAGNOSTICS_SAMPLE_RATE``.
+"""
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEBUG_PARAM = 'debug'
+DEBUG_VALUE = 'listing'
+
+
+def diagnostics_enabled(request):
+    if request is None:
+        return False
+    if request.GET.get(DEBUG_PARAM) == DEBUG_VALUE:
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            return True
+    rate = getattr(settings, 'LISTING_DIAGNOSTICS_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class ListingDiagnostics:
+    """Records per-filter row counts for one listing request when enabled"""
+
+    def __init__(self, request, label):
+        self.enabled = diagnostics_enabled(request)
+        self.label = label
+        self.counts = []
+
+    def record(self, step, queryset):
+        if not self.enabled:
+            return
+        count = queryset.count()
+        self.counts.append((step, count))
+        logger.info(f"{self.label}: after {step} filter count: {count}")
+
+    def log_rows(self, queryset):
+        if not self.enabled:
+            return
+        logger.info(f"{self.label}: rows in queryset:")
+        for row in queryset:
+            logger.info(f"{self.label}: ID: {row.id}, Title: {row.title}")
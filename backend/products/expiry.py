@@ -0,0 +1,64 @@
+"""
+Food expiry lifecycle.
+
+The food listing hides rows whose expiry_date has passed as soon as the date
+turns over. ``archive_expired`` (run periodically by the
+``sweep_expired_food`` command) then flags them archived in batches, which
+moves them out of the partial listing indexes, and drops cart entries and
+notifications that point at them.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FoodItem, CartItem
+from . import listing_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+EXPIRING_SOON_DAYS = 3
+MAX_EXPIRING_SOON_DAYS = 30
+
+
+def active_food(queryset, today=None):
+    """
+    Food that is neither archived nor past its expiry date. is_archived=False
+    selects the partial listing indexes, and food_active_expiry_idx serves
+    the date range.
+    """
+    today = today or timezone.localdate()
+    return queryset.filter(is_archived=False, expiry_date__gte=today)
+
+
+def expiring_soon(queryset, days=EXPIRING_SOON_DAYS, today=None):
+    today = today or timezone.localdate()
+    return queryset.filter(
+        is_archived=False,
+        expiry_date__gte=today,
+        expiry_date__lte=today + timedelta(days=days),
+    ).order_by('expiry_date', 'id')
+
+
+def archive_expired(batch_size=DEFAULT_BATCH_SIZE, today=None):
+    """Archive every expired food item, batch_size rows per transaction"""
+    from notifications.models import Notification
+    today = today or timezone.localdate()
+    expired = FoodItem.objects.filter(is_archived=False, expiry_date__lt=today).order_by('expiry_date', 'id')
+    total = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            FoodItem.objects.filter(pk__in=ids).update(is_archived=True, updated_at=timezone.now())
+            CartItem.objects.filter(item_type='food', item_id__in=ids).delete()
+            Notification.objects.filter(type='food', related_item_id__in=ids).delete()
+        total += len(ids)
+        logger.info(f"Archived {len(ids)} expired food items")
+    if total:
+        # Bulk updates skip the model signals that normally do this
+        listing_cache.bump_generation('food')
+    return total
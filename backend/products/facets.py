@@ -0,0 +1,72 @@
+"""
+Filter chip counts for the product listings.
+
+Every count for a listing type comes from one aggregate query over the
+filtered queryset, using a filtered COUNT per facet value, so adding a
+category or price bucket adds a column rather than a query.
+"""
+from django.db.models import Count, Q
+
+# Upper bounds (exclusive) of the discount price histogram buckets; the
+# last bucket is open-ended
+PRICE_BUCKET_EDGES = (100, 250, 500, 1000, 2500)
+
+CHOICE_FACETS = ('category', 'condition')
+BOOLEAN_FACETS = ('is_free',)
+PRICE_FACETS = ('discount_price',)
+
+
+def _field_names(model):
+    return {field.name for field in model._meta.get_fields()}
+
+
+def price_buckets():
+    lower = 0
+    for upper in PRICE_BUCKET_EDGES:
+        yield lower, upper
+        lower = upper
+    yield lower, None
+
+
+def facet_counts(queryset):
+    model = queryset.model
+    fields = _field_names(model)
+    aggregates = {'total': Count('pk')}
+    layout = {}
+
+    for name in CHOICE_FACETS:
+        if name not in fields:
+            continue
+        choices = model._meta.get_field(name).choices
+        layout[name] = []
+        for i, (value, label) in enumerate(choices):
+            alias = f'{name}_{i}'
+            aggregates[alias] = Count('pk', filter=Q(**{name: value}))
+            layout[name].append((alias, {'value': value, 'label': label}))
+
+    for name in BOOLEAN_FACETS:
+        if name not in fields:
+            continue
+        layout[name] = []
+        for value in (True, False):
+            alias = f'{name}_{str(value).lower()}'
+            aggregates[alias] = Count('pk', filter=Q(**{name: value}))
+            layout[name].append((alias, {'value': value}))
+
+    for name in PRICE_FACETS:
+        if name not in fields:
+            continue
+        layout[name] = []
+        for i, (lower, upper) in enumerate(price_buckets()):
+            alias = f'{name}_{i}'
+            condition = Q(**{f'{name}__gte': lower})
+            if upper is not None:
+                condition &= Q(**{f'{name}__lt': upper})
+            aggregates[alias] = Count('pk', filter=condition)
+            layout[name].append((alias, {'min': lower, 'max': upper}))
+
+    row = queryset.order_by().aggregate(**aggregates)
+    result = {'total': row['total']}
+    for name, entries in layout.items():
+        result[name] = [{**entry, 'count': row[alias]} for alias, entry in entries]
+    return result
@@ -0,0 +1,237 @@
+"""
+Read-only fast path for the listing endpoints.
+
+A list page is fetched with ``.values()`` for only the columns the response
+needs and each row dict is turned into the response dict directly, without
+binding serializer fields per row. The plan is derived from the listing
+serializer's (possibly ``?fields=``-pruned) fields, so output matches the
+serializer exactly, and any field without a fast equivalent sends the
+request back through the serializer. Image URLs are joined onto an absolute
+media base URL built once per request instead of per image.
+
+Owners are embedded by running the nested serializer once per distinct
+owner on a user built from the joined columns. Relations the serializer
+lists in ``prefetch_relations`` are not joined; their rows are loaded in
+one query per page instead.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from .serializers import image_variants_payload
+
+# Annotations that serializer mixins append to a row when present
+OPTIONAL_ANNOTATIONS = ('distance_km',)
+
+# Field types whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.FloatField, serializers.ReadOnlyField,
+)
+
+
+def is_enabled():
+    return getattr(settings, 'LISTING_FAST_PATH', True)
+
+
+class MediaURLs:
+    """Absolute media URLs for one request, sharing a single base URL"""
+
+    def __init__(self, request, storage):
+        self.base = request.build_absolute_uri(storage.base_url)
+
+    def url(self, name):
+        return self.base + filepath_to_uri(name).lstrip('/')
+
+
+def source_column(model, source_attrs):
+    """``user.email`` -> ``user__email``, or None unless it is a plain column"""
+    for attr in source_attrs[:-1]:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None
+        model = field.related_model
+    try:
+        field = model._meta.get_field(source_attrs[-1])
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.is_relation:
+        return None
+    return '__'.join(source_attrs)
+
+
+class RowWriter:
+    """
+    Turns ``.values()`` rows into the representation ``serializer`` would
+    give the same rows. Build with ``for_serializer``, which returns None
+    when some field has no fast equivalent.
+    """
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.request = serializer.context['request']
+        self.columns = set()
+        self.plan = []
+        self.urls = {}
+        # relation -> RelatedRows, loaded once per page by write()
+        self.prefetches = {}
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        writer = cls(serializer)
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            step = writer.plan_field(field)
+            if step is None:
+                return None
+            writer.plan.append((name, step))
+        return writer
+
+    def plan_field(self, field):
+        if isinstance(field, serializers.SerializerMethodField):
+            planner = getattr(self, f'plan_{field.method_name}', None)
+            return planner() if planner else None
+        if isinstance(field, serializers.BaseSerializer):
+            return self.plan_nested(field)
+        if field.source == '*':
+            return None
+        prefetch = self.prefetch_for(field.source_attrs[0])
+        if prefetch is not None:
+            return prefetch.plan_attribute(field)
+        column = source_column(self.model, field.source_attrs)
+        if column is None:
+            return None
+        self.columns.add(column)
+        if isinstance(field, serializers.FileField):
+            urls = self.media_urls(column)
+            return lambda row: urls.url(row[column]) if row[column] else None
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return lambda row: row[column]
+        convert = field.to_representation
+        return lambda row: None if row[column] is None else convert(row[column])
+
+    def plan_nested(self, field):
+        """A nested serializer over a forward relation, run once per related row"""
+        if getattr(field, 'many', False) or len(field.source_attrs) != 1:
+            return None
+        relation = field.source_attrs[0]
+        try:
+            model_field = self.model._meta.get_field(relation)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.many_to_one or model_field.null:
+            return None
+        related = model_field.related_model
+        wanted = {related._meta.pk.attname}
+        for nested_field in field.fields.values():
+            if nested_field.source_attrs and source_column(related, nested_field.source_attrs[:1]):
+                wanted.add(nested_field.source_attrs[0])
+        prefetch = self.prefetch_for(relation)
+        if prefetch is not None:
+            return prefetch.plan_nested(field, wanted)
+        # from_db takes values in model field order
+        names = [f.attname for f in related._meta.concrete_fields if f.attname in wanted]
+        columns = [f'{relation}__{name}' for name in names]
+        key_column = f'{relation}__{related._meta.pk.attname}'
+        self.columns.update(columns)
+        cache = {}
+
+        def represent(row):
+            key = row[key_column]
+            if key not in cache:
+                # Unloaded attributes stay deferred and load on access
+                instance = related.from_db(None, names, [row[column] for column in columns])
+                cache[key] = field.to_representation(instance)
+            return dict(cache[key])
+        return represent
+
+    def prefetch_for(self, relation):
+        """The RelatedRows serving relation, or None when it is joined"""
+        if relation not in getattr(self.serializer, 'prefetch_relations', ()):
+            return None
+        if relation not in self.prefetches:
+            model_field = self.model._meta.get_field(relation)
+            self.columns.add(model_field.attname)
+            self.prefetches[relation] = RelatedRows(model_field)
+        return self.prefetches[relation]
+
+    def media_urls(self, column):
+        if column not in self.urls:
+            storage = self.model._meta.get_field(column).storage
+            self.urls[column] = MediaURLs(self.request, storage)
+        return self.urls[column]
+
+    def plan_get_image_url(self):
+        self.columns.add('image')
+        urls = self.media_urls('image')
+        return lambda row: urls.url(row['image']) if row['image'] else None
+
+    def plan_get_image_variants(self):
+        self.columns.update(('image', 'image_variants'))
+        urls = self.media_urls('image')
+        return lambda row: image_variants_payload(row['image'], row['image_variants'], urls.url)
+
+    def values(self, queryset, ordering=()):
+        """The rows to paginate: planned columns plus the sort key columns"""
+        columns = set(self.columns)
+        columns.update(field.lstrip('-') for field in ordering)
+        columns.update(name for name in OPTIONAL_ANNOTATIONS if name in queryset.query.annotations)
+        return queryset.values(*sorted(columns))
+
+    def write(self, rows):
+        for prefetch in self.prefetches.values():
+            prefetch.load(rows)
+        data = []
+        for row in rows:
+            item = {name: step(row) for name, step in self.plan}
+            for name in OPTIONAL_ANNOTATIONS:
+                if row.get(name) is not None:
+                    item[name] = row[name]
+            data.append(item)
+        return data
+
+
+class RelatedRows:
+    """A forward relation loaded in one query per page rather than joined"""
+
+    def __init__(self, model_field):
+        self.key_column = model_field.attname
+        self.related = model_field.related_model
+        self.names = {self.related._meta.pk.attname}
+        self.instances = {}
+
+    def plan_attribute(self, field):
+        if len(field.source_attrs) != 2 or isinstance(field, serializers.FileField):
+            return None
+        name = field.source_attrs[1]
+        if source_column(self.related, [name]) is None:
+            return None
+        self.names.add(name)
+        convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+
+        def step(row):
+            value = getattr(self.instances[row[self.key_column]], name)
+            return value if convert is None or value is None else convert(value)
+        return step
+
+    def plan_nested(self, field, names):
+        self.names.update(names)
+        cache = {}
+
+        def represent(row):
+            key = row[self.key_column]
+            if key not in cache:
+                cache[key] = field.to_representation(self.instances[key])
+            return dict(cache[key])
+        return represent
+
+    def load(self, rows):
+        keys = {row[self.key_column] for row in rows} - self.instances.keys()
+        if keys:
+            queryset = self.related._base_manager.filter(pk__in=keys).only(*self.names)
+            self.instances.update((instance.pk, instance) for instance in queryset)
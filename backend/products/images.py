@@ -0,0 +1,187 @@
+"""
+Responsive image variants for listing photos.
+
+When a listing is saved with a new image, resized WebP and JPEG copies and a
+tiny blurred placeholder are generated on a background worker thread. The
+result is recorded in the listing's ``image_variants`` column, which the
+serializers expose as srcset strings next to ``image_url``.
+"""
+import base64
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = (('webp', 'WEBP'), ('jpeg', 'JPEG'))
+VARIANT_QUALITY = 80
+PLACEHOLDER_SIZE = 16
+VARIANTS_DIR = 'variants'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+    return _executor
+
+
+def variant_name(source_name, width, ext):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/{VARIANTS_DIR}/{stem}_{width}w.{ext}'
+
+
+def needs_variants(instance):
+    variants = instance.image_variants or {}
+    if instance.image:
+        return variants.get('source') != instance.image.name
+    return bool(variants)
+
+
+def schedule_variants(instance):
+    """Queue variant generation for instance once the current transaction commits"""
+    if not needs_variants(instance):
+        return
+    model, pk = type(instance), instance.pk
+    if not instance.image:
+        # Image was removed; drop the stale variants
+        storage, stale = instance.image.storage, instance.image_variants
+        transaction.on_commit(lambda: delete_variant_files(storage, stale))
+        _record(model, pk, None, {})
+        return
+
+    def submit():
+        if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+            get_executor().submit(_run_in_worker, model, pk)
+        else:
+            generate_variants(model, pk)
+
+    transaction.on_commit(submit)
+
+
+def _run_in_worker(model, pk):
+    close_old_connections()
+    try:
+        generate_variants(model, pk)
+    except Exception as e:
+        logger.error(f"Error generating image variants for {model.__name__} {pk}: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def generate_variants(model, pk):
+    instance = model.objects.filter(pk=pk).only('image', 'image_variants').first()
+    if instance is None or not instance.image:
+        return None
+    storage = instance.image.storage
+    source_name = instance.image.name
+
+    shared = shared_variants(storage, source_name)
+    if shared is not None:
+        # Same stored bytes as another listing: reuse its variants
+        for name in variant_files(shared):
+            storage.retain(name)
+        _replace(model, pk, storage, instance.image_variants, source_name, shared)
+        return shared
+
+    with storage.open(source_name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    opaque = image.convert('RGB') if image.mode == 'RGBA' else image
+
+    sizes = []
+    widths = [w for w in VARIANT_WIDTHS if w < image.width] or [image.width]
+    for width in widths:
+        entry = {'width': width}
+        for ext, pil_format in VARIANT_FORMATS:
+            resized = (image if pil_format == 'WEBP' else opaque).copy()
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, quality=VARIANT_QUALITY, optimize=True)
+            name = variant_name(source_name, width, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[ext] = storage.save(name, ContentFile(buffer.getvalue()))
+        sizes.append(entry)
+
+    variants = {
+        'source': source_name,
+        'width': image.width,
+        'height': image.height,
+        'placeholder': build_placeholder(opaque),
+        'sizes': sizes,
+    }
+    _replace(model, pk, storage, instance.image_variants, source_name, variants)
+    return variants
+
+
+def shared_variants(storage, source_name):
+    """Finished variants of another listing that stores the same source blob"""
+    if not hasattr(storage, 'retain'):
+        return None
+    from .models import FoodItem, FreeProduct, DiscountProduct
+    for model in (FoodItem, FreeProduct, DiscountProduct):
+        variants = model.objects.filter(
+            image=source_name, image_variants__source=source_name,
+        ).values_list('image_variants', flat=True).first()
+        if variants and all(storage.exists(name) for name in variant_files(variants)):
+            return variants
+    return None
+
+
+def build_placeholder(image):
+    """A blurred ~16px JPEG as a data URI, small enough to inline in listings"""
+    tiny = image.copy()
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    tiny.save(buffer, 'JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def variant_files(variants):
+    return {
+        entry[ext]
+        for entry in (variants or {}).get('sizes', [])
+        for ext, _ in VARIANT_FORMATS if entry.get(ext)
+    }
+
+
+def delete_variant_files(storage, variants, keep=None):
+    for name in variant_files(variants) - variant_files(keep):
+        if storage.exists(name):
+            storage.delete(name)
+
+
+def _replace(model, pk, storage, old_variants, source_name, variants):
+    # Content-addressed storage counts references, so every old file is
+    # released even when a new variant happens to share its bytes
+    keep = None if hasattr(storage, 'retain') else variants
+    delete_variant_files(storage, old_variants, keep=keep)
+    _record(model, pk, source_name, variants)
+
+
+def _record(model, pk, source_name, variants):
+    from .listing_cache import bump_generation
+    from .search import kind_for_model
+    queryset = model.objects.filter(pk=pk)
+    if source_name is not None:
+        # The image may have been replaced while this ran
+        queryset = queryset.filter(image=source_name)
+    # updated_at moves so conditional GETs see the new variants
+    if queryset.update(image_variants=variants, updated_at=timezone.now()):
+        bump_generation(kind_for_model(model))
@@ -0,0 +1,92 @@
+"""
+Response cache for the product list endpoints.
+
+Entries are keyed on the listing kind, a per-kind generation number and the
+normalized query string. Writes never delete entries: the signals in
+``products/signals.py`` bump the generation, which makes every older key
+unreachable, and the old entries age out on their own.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KINDS = ('food', 'free', 'discount')
+
+GENERATION_KEY = 'listing-cache:generation:{kind}'
+ENTRY_KEY = 'listing-cache:entry:{kind}:{scope}:{generation}:{digest}'
+STAT_KEY = 'listing-cache:stats:{kind}:{stat}'
+
+
+def get_timeout():
+    return getattr(settings, 'LISTING_CACHE_TIMEOUT', 60)
+
+
+def get_generation(kind):
+    key = GENERATION_KEY.format(kind=kind)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so an evicted counter never reuses a number
+        # whose entries might still be cached.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(kind):
+    key = GENERATION_KEY.format(kind=kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def normalize_params(request):
+    """Stable representation of the query string, ignoring order and blanks"""
+    params = []
+    for name in sorted(request.query_params.keys()):
+        values = sorted(v for v in request.query_params.getlist(name) if v != '')
+        if values:
+            params.append((name, values))
+    return params
+
+
+def entry_key(kind, request, scope='list'):
+    # Absolute URLs in the payload depend on the host the client used
+    raw = repr((request.build_absolute_uri('/'), normalize_params(request)))
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return ENTRY_KEY.format(kind=kind, scope=scope, generation=get_generation(kind), digest=digest)
+
+
+def get_cached(kind, request, scope='list'):
+    """scope separates endpoints that share a kind, e.g. 'list' and 'facets'"""
+    data = cache.get(entry_key(kind, request, scope))
+    record(kind, 'hits' if data is not None else 'misses')
+    return data
+
+
+def store(kind, request, data, scope='list'):
+    cache.set(entry_key(kind, request, scope), data, timeout=get_timeout())
+
+
+def record(kind, stat):
+    key = STAT_KEY.format(kind=kind, stat=stat)
+    if cache.add(key, 1, timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def stats():
+    keys = {
+        STAT_KEY.format(kind=kind, stat=stat): (kind, stat)
+        for kind in KINDS for stat in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys))
+    result = {kind: {'hits': 0, 'misses': 0} for kind in KINDS}
+    for key, (kind, stat) in keys.items():
+        result[kind][stat] = values.get(key, 0)
+    return result
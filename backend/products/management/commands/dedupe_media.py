@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F, Value
+from django.db.models.functions import Replace
+
+from products import images
+from products.models import FoodItem, FreeProduct, DiscountProduct, CartItem
+from products.storage import hash_content, listing_image_storage
+
+
+class Command(BaseCommand):
+    help = 'Move listing images uploaded before content-addressed storage into blobs/, folding duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report duplicates without moving anything')
+
+    def handle(self, *args, **options):
+        storage = listing_image_storage()
+        dry_run = options['dry_run']
+        moved, missing, saved_bytes = 0, 0, 0
+        seen = set()
+
+        # Listings copied from one another share a legacy file; each file is
+        # moved once and every row pointing at it follows to the blob
+        shared = defaultdict(list)
+        for model in (FoodItem, FreeProduct, DiscountProduct):
+            rows = model.objects.exclude(image='').exclude(image__isnull=True)
+            for pk, name in rows.values_list('pk', 'image').iterator():
+                if not storage.is_blob(name):
+                    shared[name].append((model, pk))
+
+        for name, rows in shared.items():
+            if not storage.exists(name):
+                for model, pk in rows:
+                    self.stderr.write(f'{model.__name__} {pk}: {name} is missing')
+                missing += len(rows)
+                continue
+
+            with storage.open(name, 'rb') as f:
+                digest, size = hash_content(f)
+                if digest in seen or storage.exists(storage.blob_name(digest, name)):
+                    saved_bytes += size
+                seen.add(digest)
+                if dry_run:
+                    continue
+                # Holds one reference; retain() adds one per further row
+                blob_name = storage.save(name, f)
+
+            refs = 0
+            for model, pk in rows:
+                if not model.objects.filter(pk=pk, image=name).update(image=blob_name):
+                    continue
+                if refs:
+                    storage.retain(blob_name)
+                refs += 1
+                # Regenerates variants, or reuses them when another listing
+                # already has the same blob, and removes the old ones
+                try:
+                    images.generate_variants(model, pk)
+                except Exception as e:
+                    self.stderr.write(f'{model.__name__} {pk}: variants not generated: {str(e)}')
+            if not refs:
+                # Every row changed its image meanwhile
+                storage.delete(blob_name)
+                continue
+            self.rewrite_cart_urls(name, blob_name)
+            storage.delete(name)
+            moved += refs
+
+        verb = 'Would reclaim' if dry_run else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} images, {len(seen)} distinct. '
+            f'{verb} {saved_bytes} bytes of duplicates. {missing} missing.'
+        ))
+
+    def rewrite_cart_urls(self, old_name, new_name):
+        # Cart rows keep a copy of the absolute image URL
+        old_url = f'{settings.MEDIA_URL}{old_name}'
+        CartItem.objects.filter(image_url__endswith=old_url).update(
+            image_url=Replace(F('image_url'), Value(old_url), Value(f'{settings.MEDIA_URL}{new_name}'))
+        )
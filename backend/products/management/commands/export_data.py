@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream a dataset (listings, requests or reputation history) as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(exports.DATASETS))
+        parser.add_argument('--format', dest='export_format', choices=list(exports.FORMATS), default='ndjson')
+        parser.add_argument('--output', default='-', help='File to write to; - for stdout')
+        parser.add_argument('--since', help='Only rows created on or after this ISO date or datetime')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        try:
+            since = exports.parse_since(options['since'])
+            blocks = exports.stream_export(
+                options['dataset'], options['export_format'], since, options['chunk_size'],
+            )
+        except exports.ExportError as e:
+            raise CommandError(str(e))
+
+        written = 0
+        if options['output'] == '-':
+            for block in blocks:
+                # Blocks end on line boundaries, so each decodes on its own
+                self.stdout.write(block.decode('utf-8'), ending='')
+                written += len(block)
+        else:
+            with open(options['output'], 'wb') as f:
+                for block in blocks:
+                    f.write(block)
+                    written += len(block)
+        self.stderr.write(f"Exported {options['dataset']} ({written} bytes)")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products import images
+from products.models import FoodItem, FreeProduct, DiscountProduct
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or stale image variants for existing listings'
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (FoodItem, FreeProduct, DiscountProduct):
+            queryset = model.objects.exclude(image='').exclude(image__isnull=True)
+            for instance in queryset.only('pk', 'image', 'image_variants').iterator():
+                if not images.needs_variants(instance):
+                    continue
+                try:
+                    images.generate_variants(model, instance.pk)
+                    total += 1
+                except Exception as e:
+                    self.stderr.write(f'{model.__name__} {instance.pk}: {str(e)}')
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {total} listings'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import geo
+from products.models import FoodItem, FreeProduct, DiscountProduct
+from requests.models import Request
+
+
+class Command(BaseCommand):
+    help = 'Re-resolve listing and request locations against the gazetteer'
+
+    def handle(self, *args, **options):
+        resolved, unknown = 0, 0
+        for model in (FoodItem, FreeProduct, DiscountProduct, Request):
+            locations = model.objects.order_by().values_list('location', flat=True).distinct()
+            for location in list(locations):
+                point = geo.geocode(location)
+                if point is None:
+                    fields = {'latitude': None, 'longitude': None, 'geo_cell': ''}
+                    unknown += 1
+                else:
+                    fields = {'latitude': point[0], 'longitude': point[1], 'geo_cell': geo.encode_geohash(*point)}
+                    resolved += 1
+                model.objects.filter(location=location).update(**fields)
+        self.stdout.write(self.style.SUCCESS(
+            f'Resolved {resolved} distinct locations, {unknown} not in the gazetteer'
+        ))
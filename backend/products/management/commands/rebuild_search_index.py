@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from products import search
+from products.models import FoodItem, FreeProduct, DiscountProduct
+from requests.models import Request
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for product listings and requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write('Full-text index table not present on this database; nothing to rebuild.')
+            return
+        total = search.rebuild_index(
+            [FoodItem, FreeProduct, DiscountProduct, Request],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} listings'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import expiry
+
+
+class Command(BaseCommand):
+    help = 'Archive expired food items and remove their cart entries and notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=expiry.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sweeping every N seconds (0 runs once)')
+
+    def handle(self, *args, **options):
+        while True:
+            total = expiry.archive_expired(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Archived {total} expired food items'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
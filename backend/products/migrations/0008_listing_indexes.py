@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_cartitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['-created_at', '-id'], name='disc_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='disc_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['condition', '-created_at', '-id'], name='disc_cond_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['discount_price', 'created_at'], name='disc_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['-created_at', '-id'], name='food_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='food_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_free', True)), fields=['-created_at', '-id'], name='food_free_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='freeproduct',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-created_at', '-id'], name='free_avail_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='freeproduct',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', '-created_at', '-id'], name='free_avail_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='freeproduct',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['condition', '-created_at', '-id'], name='free_avail_cond_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+FTS_TABLE = 'products_listing_fts'
+
+KIND_CODES = {'food': 1, 'free': 2, 'discount': 3}
+
+LISTING_MODELS = [
+    ('FoodItem', 'food', 'products_fooditem'),
+    ('FreeProduct', 'free', 'products_freeproduct'),
+    ('DiscountProduct', 'discount', 'products_discountproduct'),
+]
+
+PG_VECTOR = (
+    "(setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B'))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"title, description, kind UNINDEXED, item_id UNINDEXED, "
+                    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            except Exception:
+                # SQLite built without FTS5; search keeps using icontains
+                return
+            for model_name, kind, _ in LISTING_MODELS:
+                model = apps.get_model('products', model_name)
+                rows = [
+                    (pk * 4 + KIND_CODES[kind], title, description, kind, pk)
+                    for pk, title, description in model.objects.values_list('pk', 'title', 'description')
+                ]
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, description, kind, item_id) '
+                    f'VALUES (%s, %s, %s, %s, %s)',
+                    rows
+                )
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for _, kind, table in LISTING_MODELS:
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {kind}_search_gin ON {table} USING GIN ({PG_VECTOR})'
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            for _, kind, _ in LISTING_MODELS:
+                cursor.execute(f'DROP INDEX IF EXISTS {kind}_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
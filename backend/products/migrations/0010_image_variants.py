@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_listing_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discountproduct',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='freeproduct',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
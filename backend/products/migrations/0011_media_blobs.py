@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:08
+
+import django.core.validators
+import products.models
+import products.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='discountproduct',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.listing_image_storage, upload_to=products.models.discount_product_image_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])]),
+        ),
+        migrations.AlterField(
+            model_name='fooditem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.listing_image_storage, upload_to=products.models.food_image_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])]),
+        ),
+        migrations.AlterField(
+            model_name='freeproduct',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=products.storage.listing_image_storage, upload_to=products.models.free_product_image_path, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])]),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core import geo
+
+GEOCODED_MODELS = ['FoodItem', 'FreeProduct', 'DiscountProduct']
+
+
+def geocode_existing_rows(apps, schema_editor):
+    # One update per distinct location string
+    for model_name in GEOCODED_MODELS:
+        model = apps.get_model('products', model_name)
+        locations = model.objects.order_by().values_list('location', flat=True).distinct()
+        for location in list(locations):
+            point = geo.geocode(location)
+            if point is not None:
+                model.objects.filter(location=location).update(
+                    latitude=point[0], longitude=point[1], geo_cell=geo.encode_geohash(*point),
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_media_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='discountproduct',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='discountproduct',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='discountproduct',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='freeproduct',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='freeproduct',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='freeproduct',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='disc_geo_cell_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='food_geo_cell_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='freeproduct',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='free_geo_cell_idx'),
+        ),
+        migrations.RunPython(geocode_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_geocoded_locations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='fooditem',
+            name='food_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fooditem',
+            name='food_cat_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fooditem',
+            name='food_free_created_idx',
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['-created_at', '-id'], name='food_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['category', '-created_at', '-id'], name='food_active_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_archived', False), ('is_free', True)), fields=['-created_at', '-id'], name='food_active_free_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['expiry_date', 'id'], name='food_active_expiry_idx'),
+        ),
+    ]
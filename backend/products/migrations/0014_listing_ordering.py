@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:21
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_food_expiry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='discountproduct',
+            name='disc_price_idx',
+        ),
+        migrations.AddField(
+            model_name='discountproduct',
+            name='discount_percentage',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(original_price__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('original_price'), '-', models.F('discount_price')), '*', models.Value(1000)), '+', django.db.models.expressions.CombinedExpression(models.F('original_price'), '/', models.Value(2))), '/', models.F('original_price')), models.FloatField()), '/', models.Value(10))), default=models.Value(0.0)), output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['discount_price', 'id'], name='disc_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discountproduct',
+            index=models.Index(fields=['-discount_percentage', '-id'], name='disc_percentage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(django.db.models.functions.comparison.Coalesce('price', models.Value(0)), models.F('id'), condition=models.Q(('is_archived', False)), name='food_active_price_idx'),
+        ),
+    ]
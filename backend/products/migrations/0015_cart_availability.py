@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_listing_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='is_available',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
+from django.db.models.functions import Cast, Coalesce
+from .storage import listing_image_storage
 
 User = get_user_model()
 
@@ -16,6 +18,10 @@ def discount_product_image_path(instance, filename):
     # Generate a unique path for each discount product image
     return f'discount_products/{instance.user.id}/{filename}'
 
+# Sort key for ?ordering=price on food: free items have no price and sort
+# as the cheapest. Shared by the listing view and the index serving it.
+FOOD_SORT_PRICE = Coalesce('price', models.Value(0))
+
 class FoodItem(models.Model):
     CATEGORY_CHOICES = [
         ('vegetables', 'Vegetables'),
@@ -33,13 +39,22 @@ class FoodItem(models.Model):
     price = models.IntegerField(null=True, blank=True)
     is_free = models.BooleanField(default=False)
     location = models.CharField(max_length=200)
+    # Resolved from location by core.geo; null when the place is unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.CharField(max_length=12, blank=True, default='')
     expiry_date = models.DateField()
+    # Set by the expiry sweeper (products/expiry.py) once expiry_date passes
+    is_archived = models.BooleanField(default=False)
     image = models.ImageField(
         upload_to=food_image_path,
+        storage=listing_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])],
         null=True,
         blank=True
     )
+    # Resized WebP/JPEG copies and blur placeholder, see products/images.py
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='food_items')
@@ -55,6 +70,39 @@ class FoodItem(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listing order, optionally narrowed by category or free_only.
+            # The listing never shows archived food.
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='food_active_created_idx',
+                condition=models.Q(is_archived=False),
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='food_active_cat_idx',
+                condition=models.Q(is_archived=False),
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='food_active_free_idx',
+                condition=models.Q(is_free=True, is_archived=False),
+            ),
+            # Expiring-soon listing and the expiry sweeper
+            models.Index(
+                fields=['expiry_date', 'id'],
+                name='food_active_expiry_idx',
+                condition=models.Q(is_archived=False),
+            ),
+            # ?ordering=price
+            models.Index(
+                FOOD_SORT_PRICE, 'id',
+                name='food_active_price_idx',
+                condition=models.Q(is_archived=False),
+            ),
+            # Radius search: cell range scan that also covers the distance check
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='food_geo_cell_idx'),
+        ]
 
 class FreeProduct(models.Model):
     CATEGORY_CHOICES = [
@@ -81,12 +129,19 @@ class FreeProduct(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
     location = models.CharField(max_length=200)
+    # Resolved from location by core.geo; null when the place is unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.CharField(max_length=12, blank=True, default='')
     image = models.ImageField(
         upload_to=free_product_image_path,
+        storage=listing_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])],
         null=True,
         blank=True
     )
+    # Resized WebP/JPEG copies and blur placeholder, see products/images.py
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='free_products')
@@ -97,6 +152,26 @@ class FreeProduct(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The listing only ever shows available products
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='free_avail_created_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                name='free_avail_cat_idx',
+                condition=models.Q(is_available=True),
+            ),
+            models.Index(
+                fields=['condition', '-created_at', '-id'],
+                name='free_avail_cond_idx',
+                condition=models.Q(is_available=True),
+            ),
+            # Radius search: cell range scan that also covers the distance check
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='free_geo_cell_idx'),
+        ]
 
 class DiscountProduct(models.Model):
     CATEGORY_CHOICES = [
@@ -124,13 +199,38 @@ class DiscountProduct(models.Model):
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
     original_price = models.IntegerField()
     discount_price = models.IntegerField()
+    # Computed by the database so listings can sort and paginate on it.
+    # Tenths of a percent are rounded half up in integer arithmetic, which
+    # every backend evaluates alike (PostgreSQL has no round() for floats).
+    discount_percentage = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                original_price__gt=0,
+                then=Cast(
+                    ((models.F('original_price') - models.F('discount_price')) * 1000
+                     + models.F('original_price') / 2) / models.F('original_price'),
+                    models.FloatField(),
+                ) / 10,
+            ),
+            default=models.Value(0.0),
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
     location = models.CharField(max_length=200)
+    # Resolved from location by core.geo; null when the place is unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.CharField(max_length=12, blank=True, default='')
     image = models.ImageField(
         upload_to=discount_product_image_path,
+        storage=listing_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'gif'])],
         null=True,
         blank=True
     )
+    # Resized WebP/JPEG copies and blur placeholder, see products/images.py
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='discount_products')
@@ -139,16 +239,45 @@ class DiscountProduct(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_prices = instance.prices()
+        return instance
+
+    def prices(self):
+        return (self.__dict__.get('original_price'), self.__dict__.get('discount_price'))
+
     def save(self, *args, **kwargs):
         # Ensure discount price is less than original price
         if self.discount_price >= self.original_price:
             raise ValueError("Discount price must be less than original price")
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if not adding and self.prices() != getattr(self, '_saved_prices', None):
+            # Inserts return generated columns; updates do not. Deferred, the
+            # new percentage loads on first access.
+            self.__dict__.pop('discount_percentage', None)
+        self._saved_prices = self.prices()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='disc_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='disc_cat_created_idx'),
+            models.Index(fields=['condition', '-created_at', '-id'], name='disc_cond_created_idx'),
+            # min_price / max_price range filters and ?ordering=price
+            models.Index(fields=['discount_price', 'id'], name='disc_price_idx'),
+            # ?ordering=discount
+            models.Index(fields=['-discount_percentage', '-id'], name='disc_percentage_idx'),
+            # Radius search: cell range scan that also covers the distance check
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='disc_geo_cell_idx'),
+        ]
 
 class CartItem(models.Model):
+    # One-off listings: a line for one of these always holds a single unit
+    SINGLE_ITEM_TYPES = ('free', 'discount')
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
     item_type = models.CharField(max_length=20)  # 'food', 'free', 'discount'
     item_id = models.IntegerField()
@@ -157,6 +286,8 @@ class CartItem(models.Model):
     price = models.IntegerField()
     quantity = models.IntegerField(default=1)
     image_url = models.URLField(null=True, blank=True)
+    # Cleared by products.cart.revalidate when the listing is gone, sold or expired
+    is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -165,4 +296,39 @@ class CartItem(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.user.email}'s cart - {self.title}" 
\ No newline at end of file
+        return f"{self.user.email}'s cart - {self.title}"
+
+class Transaction(models.Model):
+    """One cart line bought at checkout, at the price charged for it"""
+    PAYMENT_METHOD_CHOICES = [
+        ('card', 'Card'),
+        ('bkash', 'bKash'),
+        ('cod', 'Cash on Delivery'),
+    ]
+
+    buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='purchases')
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales')
+    item_type = models.CharField(max_length=20)  # 'food', 'free', 'discount'
+    item_id = models.IntegerField()
+    title = models.CharField(max_length=200)
+    price = models.IntegerField()
+    quantity = models.IntegerField(default=1)
+    payment_method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.buyer.email} bought {self.title} from {self.seller.email}"
+
+class MediaBlob(models.Model):
+    """One stored image file, shared by every listing that uploaded the same bytes"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
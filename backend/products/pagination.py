@@ -0,0 +1,217 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor_token(payload):
+    """Pack a cursor payload into an opaque, URL-safe token"""
+    raw = json.dumps(payload, separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor_token(token):
+    """Inverse of encode_cursor_token; raises ValueError on a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (TypeError, ValueError) as e:
+        raise ValueError('invalid cursor') from e
+    if not isinstance(payload, dict):
+        raise ValueError('invalid cursor')
+    return payload
+
+
+class ListingCursorPagination(BasePagination):
+    """
+    Keyset pagination for the listing endpoints.
+
+    Pages are addressed by an opaque cursor that encodes the sort key of the
+    row at the page boundary, so fetching page N is a single indexed range
+    scan instead of an OFFSET over everything before it.
+
+    ``truncated`` is true when a search or radius filter capped its matches
+    (see ``results_truncated`` on the view), so later pages would be missing
+    rows that matched.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.truncated = getattr(view, 'results_truncated', False)
+
+        cursor = self.decode_cursor(request, queryset)
+        self.has_cursor = cursor is not None
+        reverse = bool(cursor and cursor['r'])
+
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, cursor['v']))
+
+        # Fetch one row past the page to learn whether another page exists.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = self.has_cursor
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.has_cursor
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'truncated': self.truncated,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'truncated': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """Views may narrow or replace the default sort key."""
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        """
+        Build the row-value comparison ``(a, b, ...) > (x, y, ...)`` as an OR
+        of prefix-equal terms, honouring the direction of each sort column.
+        """
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(ordering[:i], values[:i]):
+                term &= Q(**{prev_field.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+    def position_from_instance(self, instance):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Rows from .values() on the listing fast path are dicts
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def encode_cursor(self, instance, reverse):
+        token = encode_cursor_token({'v': self.position_from_instance(instance), 'r': reverse})
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = decode_cursor_token(token)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        values = payload.get('v')
+        reverse = bool(payload.get('r'))
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': self.cursor_values(queryset, values), 'r': reverse}
+
+    def cursor_values(self, queryset, values):
+        """
+        Coerce decoded values with their sort fields, so a tampered cursor is
+        a 404 rather than an error from the filter it would build.
+        """
+        coerced = []
+        for field, value in zip(self.ordering, values):
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                value = self.sort_field(queryset, field.lstrip('-')).to_python(value)
+            except (FieldDoesNotExist, FieldError, ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            coerced.append(value)
+        return coerced
+
+    @staticmethod
+    def sort_field(queryset, name):
+        """The model field or annotation output field a sort key reads"""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,403 @@
+"""
+Full-text search over product listings.
+
+On SQLite the listings are mirrored into an FTS5 table that the signals in
+``products/signals.py`` keep current. On PostgreSQL the same queries run
+against a weighted ``tsvector`` expression backed by GIN indexes. Any other
+backend falls back to the original ``icontains`` filter.
+"""
+import heapq
+import re
+from datetime import date, datetime
+
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+
+FTS_TABLE = 'products_listing_fts'
+
+# Cap on ranked matches pulled from the index for a single search. Lower
+# ranked matches are dropped; responses report this as "truncated".
+MAX_RESULTS = 1000
+
+# Same vocabulary as CartItem.item_type / ReputationHistory.related_item_type,
+# plus community requests which share the index
+KIND_CODES = {'request': 0, 'food': 1, 'free': 2, 'discount': 3}
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+SNIPPET_TOKENS = 16
+
+# Tie-break order between item types in merged results
+KIND_ORDER = ['food', 'free', 'discount', 'request']
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_fts_ready = None
+
+
+def kind_for_model(model):
+    """Map an indexed model to its item_type code"""
+    from .models import FoodItem, FreeProduct, DiscountProduct
+    from requests.models import Request
+    return {
+        FoodItem: 'food',
+        FreeProduct: 'free',
+        DiscountProduct: 'discount',
+        Request: 'request',
+    }[model]
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def fts_rowid(kind, item_id):
+    # Pack kind and id into the FTS rowid so updates are a rowid lookup
+    return item_id * 4 + KIND_CODES[kind]
+
+
+def fts_available():
+    global _fts_ready
+    if connection.vendor != 'sqlite':
+        return False
+    if _fts_ready is None:
+        _fts_ready = FTS_TABLE in connection.introspection.table_names()
+    return _fts_ready
+
+
+def reset_fts_cache(**kwargs):
+    """Forget whether the FTS table exists; connected to post_migrate"""
+    global _fts_ready
+    _fts_ready = None
+
+
+def build_fts_query(text):
+    """Turn free text into an FTS5 query that prefix-matches every word"""
+    return ' '.join(f'"{token}"*' for token in tokenize(text))
+
+
+def build_tsquery(text):
+    return ' & '.join(f'{token}:*' for token in tokenize(text))
+
+
+def index_listing(instance):
+    if not fts_available():
+        return
+    kind = kind_for_model(type(instance))
+    rowid = fts_rowid(kind, instance.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, kind, item_id) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [rowid, instance.title, instance.description, kind, instance.pk]
+        )
+
+
+def index_listings(instances):
+    """Mirror several rows of one model into the FTS table in two statements"""
+    if not instances or not fts_available():
+        return
+    kind = kind_for_model(type(instances[0]))
+    rowids = [fts_rowid(kind, instance.pk) for instance in instances]
+    placeholders = ', '.join(['%s'] * len(rowids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', rowids)
+        _insert_rows(cursor, [
+            (rowid, instance.title, instance.description, kind, instance.pk)
+            for rowid, instance in zip(rowids, instances)
+        ])
+
+
+def remove_listing(instance):
+    if not fts_available():
+        return
+    rowid = fts_rowid(kind_for_model(type(instance)), instance.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [rowid])
+
+
+def rebuild_index(models, batch_size=1000):
+    """Re-mirror every row of the given listing models into the FTS table"""
+    if not fts_available():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        for model in models:
+            kind = kind_for_model(model)
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE kind = %s', [kind])
+            rows = model.objects.order_by().values_list('pk', 'title', 'description')
+            batch = []
+            for pk, title, description in rows.iterator(chunk_size=batch_size):
+                batch.append((fts_rowid(kind, pk), title, description, kind, pk))
+                if len(batch) >= batch_size:
+                    _insert_rows(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                _insert_rows(cursor, batch)
+                total += len(batch)
+    return total
+
+
+def _insert_rows(cursor, rows):
+    cursor.executemany(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, description, kind, item_id) '
+        f'VALUES (%s, %s, %s, %s, %s)',
+        rows
+    )
+
+
+def ranked_matches(model, text, limit=None, within=None):
+    """
+    Return ``(id, score)`` pairs matching text, best match first, and
+    whether more than ``limit`` (default MAX_RESULTS) rows matched.
+
+    Scores are negated bm25 values, so higher is better and scores from
+    different listing types are comparable. ``within`` restricts the
+    matches to a queryset's rows before ``limit`` is applied, so filters
+    on the listing never discard matches that rank below the cap.
+    """
+    match = build_fts_query(text)
+    if not match:
+        return [], False
+    sql = f'SELECT item_id, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND kind = %s'
+    params = [match, kind_for_model(model)]
+    if within is not None:
+        try:
+            within_sql, within_params = within.order_by().values('pk').query.sql_with_params()
+        except EmptyResultSet:
+            return [], False
+        sql += f' AND item_id IN ({within_sql})'
+        params.extend(within_params)
+    limit = limit or MAX_RESULTS
+    with connection.cursor() as cursor:
+        # One row past the cap tells a full result set from a truncated one
+        cursor.execute(sql + ' ORDER BY rank LIMIT %s', [*params, limit + 1])
+        rows = cursor.fetchall()
+    return [(item_id, -rank) for item_id, rank in rows[:limit]], len(rows) > limit
+
+
+def annotate_score(queryset, text, memo=None):
+    """
+    Restrict queryset to rows matching text and annotate ``search_score``.
+
+    Higher scores are better. Backends without ranking get a constant score
+    so callers can still order on it. Pass a dict as memo to reuse index
+    lookups when one request builds the same search more than once, and to
+    learn from ``is_truncated`` whether any of them hit MAX_RESULTS.
+    """
+    if fts_available():
+        # Filters already on the queryset narrow the matches before the cap
+        key = (queryset.model, text, _filter_key(queryset))
+        if memo is not None and key in memo:
+            matches, truncated = memo[key]
+        else:
+            matches, truncated = ranked_matches(queryset.model, text, within=queryset)
+            if memo is not None:
+                memo[key] = matches, truncated
+        if not matches:
+            return queryset.none().annotate(search_score=Value(0.0, output_field=FloatField()))
+        score = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in matches],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=[pk for pk, _ in matches]).annotate(search_score=score)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        tsquery = build_tsquery(text)
+        if not tsquery:
+            return queryset.none().annotate(search_score=Value(0.0, output_field=FloatField()))
+        query = SearchQuery(tsquery, search_type='raw', config='english')
+        return queryset.annotate(
+            search_vector=_search_vector(),
+        ).filter(search_vector=query).annotate(
+            search_score=SearchRank(_search_vector(), query),
+        )
+
+    return queryset.filter(
+        Q(title__icontains=text) | Q(description__icontains=text)
+    ).annotate(search_score=Value(0.0, output_field=FloatField()))
+
+
+def is_truncated(memo):
+    """Whether any index lookup recorded in an ``annotate_score`` memo was capped"""
+    return any(truncated for _, truncated in memo.values())
+
+
+def _filter_key(queryset):
+    try:
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return None
+    return sql, tuple(params)
+
+
+def search_queryset(queryset, text, memo=None):
+    """
+    Restrict queryset to listings matching text.
+
+    Returns the filtered queryset and the ordering that ranks it, or None
+    when the backend cannot rank and the caller's ordering should stand.
+    """
+    queryset = annotate_score(queryset, text, memo)
+    if fts_available() or connection.vendor == 'postgresql':
+        return queryset, ('-search_score', '-id')
+    return queryset, None
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('description', weight='B', config='english')
+    )
+
+
+def attach_highlights(items, text):
+    """
+    Set ``search_highlight`` on each listing in items.
+
+    Only called for the page being returned, so snippet generation never
+    touches rows that are not serialized.
+    """
+    if not items:
+        return items
+    model = type(items[0])
+    highlights = {}
+
+    if fts_available():
+        match = build_fts_query(text)
+        if not match:
+            return items
+        kind = kind_for_model(model)
+        rowids = [fts_rowid(kind, item.pk) for item in items]
+        placeholders = ', '.join(['%s'] * len(rowids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT item_id, '
+                f'highlight({FTS_TABLE}, 0, %s, %s), '
+                f'snippet({FTS_TABLE}, 1, %s, %s, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})',
+                [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END,
+                 '…', SNIPPET_TOKENS, match, *rowids]
+            )
+            for item_id, title, description in cursor.fetchall():
+                highlights[item_id] = {'title': title, 'description': description}
+
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery
+        tsquery = build_tsquery(text)
+        if not tsquery:
+            return items
+        query = SearchQuery(tsquery, search_type='raw', config='english')
+        options = {'start_sel': HIGHLIGHT_START, 'stop_sel': HIGHLIGHT_END, 'config': 'english'}
+        rows = model.objects.filter(pk__in=[item.pk for item in items]).annotate(
+            title_highlight=SearchHeadline('title', query, highlight_all=True, **options),
+            description_highlight=SearchHeadline('description', query, max_words=SNIPPET_TOKENS, **options),
+        ).values_list('pk', 'title_highlight', 'description_highlight')
+        for pk, title, description in rows:
+            highlights[pk] = {'title': title, 'description': description}
+
+    for item in items:
+        item.search_highlight = highlights.get(item.pk)
+    return items
+
+
+def merged_search(sources, text, sort, cursor, page_size):
+    """
+    K-way merge several querysets into one stream ordered by relevance or
+    recency.
+
+    sources maps item_type to a queryset. cursor is the merge position of the
+    last row already returned, or None for the first page. Each source
+    contributes at most page_size + 1 rows past the cursor, so any page
+    costs one bounded query per source.
+
+    Returns the page as ``(item_type, instance)`` pairs, the cursor for the
+    next page or None when the stream is exhausted, and whether any source's
+    matches were cut at MAX_RESULTS.
+    """
+    ranked = sort == 'relevance' and bool(text)
+    fields = ('search_score', 'created_at') if ranked else ('created_at',)
+
+    memo = {}
+    querysets = {
+        kind: annotate_score(queryset, text, memo) if text else queryset
+        for kind, queryset in sources.items()
+    }
+    if cursor is not None and querysets:
+        cursor = _parse_cursor(cursor, sort, fields, next(iter(querysets.values())))
+
+    streams = []
+    for kind, queryset in querysets.items():
+        queryset = queryset.order_by(*[f'-{field}' for field in fields], '-id')
+        if cursor is not None:
+            queryset = queryset.filter(_after_cursor(kind, fields, cursor))
+        rank = KIND_ORDER.index(kind)
+        streams.append([
+            (tuple(getattr(obj, field) for field in fields) + (-rank, obj.pk), kind, obj)
+            for obj in queryset[:page_size + 1]
+        ])
+
+    merged = heapq.merge(*streams, key=lambda row: row[0], reverse=True)
+    page = [row for _, row in zip(range(page_size + 1), merged)]
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        key, kind, obj = page[-1]
+        next_cursor = {
+            's': sort,
+            'v': [_cursor_value(value) for value in key[:len(fields)]],
+            'k': kind,
+            'id': obj.pk,
+        }
+    return [(kind, obj) for _, kind, obj in page], next_cursor, is_truncated(memo)
+
+
+def _parse_cursor(cursor, sort, fields, queryset):
+    """
+    Check a decoded cursor against this search and coerce its values with
+    the sort fields; raises ValueError for a cursor it cannot have issued.
+    """
+    from .pagination import ListingCursorPagination
+    values, item_id = cursor.get('v'), cursor.get('id')
+    if (cursor.get('s') != sort or cursor.get('k') not in KIND_ORDER
+            or not isinstance(values, list) or len(values) != len(fields)
+            or not isinstance(item_id, int) or isinstance(item_id, bool)):
+        raise ValueError('cursor does not belong to this search')
+    coerced = []
+    for field, value in zip(fields, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError('invalid cursor value')
+        try:
+            value = ListingCursorPagination.sort_field(queryset, field).to_python(value)
+        except (ValidationError, TypeError) as e:
+            raise ValueError('invalid cursor value') from e
+        if value is None:
+            raise ValueError('invalid cursor value')
+        coerced.append(value)
+    return {**cursor, 'v': coerced}
+
+
+def _after_cursor(kind, fields, cursor):
+    """Rows of kind that sort strictly after the cursor in the merged order"""
+    from .pagination import ListingCursorPagination
+    values = cursor['v']
+    after = ListingCursorPagination.keyset_filter([f'-{field}' for field in fields], values)
+
+    tie = Q(**dict(zip(fields, values)))
+    rank, cursor_rank = KIND_ORDER.index(kind), KIND_ORDER.index(cursor['k'])
+    if rank > cursor_rank:
+        after |= tie
+    elif rank == cursor_rank:
+        after |= tie & Q(pk__lt=cursor['id'])
+    return after
+
+
+def _cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -1,21 +1,120 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
 from rest_framework import serializers
-from .models import FoodItem, FreeProduct, DiscountProduct, CartItem
+from .models import FoodItem, FreeProduct, DiscountProduct, CartItem, Transaction
 from users.serializers import PublicUserSerializer
+from core.geo import DistanceSerializerMixin
+from core.fieldsets import SparseFieldsetMixin
 
-class FoodItemSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin:
+    """Derives select_related/prefetch_related from the fields a serializer declares"""
+    # Relations fetched in a second query rather than joined into the listing
+    prefetch_relations = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        if fields is None:
+            fields = cls().fields
+        select, prefetch = set(), set()
+        for field in fields.values():
+            if field.write_only or field.source == '*':
+                continue
+            model = cls.Meta.model
+            path = []
+            for attr in field.source.split('.'):
+                try:
+                    model_field = model._meta.get_field(attr)
+                except FieldDoesNotExist:
+                    break
+                if not model_field.is_relation:
+                    break
+                path.append(attr)
+                if model_field.many_to_many or model_field.one_to_many or '__'.join(path) in cls.prefetch_relations:
+                    prefetch.add('__'.join(path))
+                    break
+                select.add('__'.join(path))
+                model = model_field.related_model
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+class SearchHighlightMixin:
+    """Adds search_highlight to listings that came back from a full-text search"""
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'search_highlight'):
+            data['search_highlight'] = instance.search_highlight
+        return data
+
+def image_variants_payload(image_name, variants, url):
+    """srcset payload for stored image_variants; url maps a storage name to a URL"""
+    variants = variants or {}
+    if not image_name or variants.get('source') != image_name:
+        return None
+    srcsets = {}
+    for ext in ('webp', 'jpeg'):
+        srcsets[f'{ext}_srcset'] = ', '.join(
+            f"{url(size[ext])} {size['width']}w" for size in variants.get('sizes', [])
+        )
+    return {
+        'placeholder': variants.get('placeholder'),
+        'width': variants.get('width'),
+        'height': variants.get('height'),
+        **srcsets,
+    }
+
+class ImageVariantsMixin:
+    """Exposes generated image variants as srcset strings; None until they are ready"""
+    def get_image_variants(self, obj):
+        if not obj.image:
+            return None
+        storage = obj.image.storage
+        request = self.context.get('request')
+
+        def url(name):
+            path = storage.url(name)
+            return request.build_absolute_uri(path) if request else path
+
+        return image_variants_payload(obj.image.name, obj.image_variants, url)
+
+class ListingImageField(serializers.ImageField):
+    """Reports files rejected by products.uploads.ListingImageUploadHandler"""
+    def to_internal_value(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise serializers.ValidationError(error)
+        return super().to_internal_value(data)
+
+class ListingImageFieldMixin:
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: ListingImageField,
+    }
+
+class FoodItemSerializer(SparseFieldsetMixin, EagerLoadingMixin, SearchHighlightMixin, DistanceSerializerMixin, ImageVariantsMixin, ListingImageFieldMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.email')
     user_id = serializers.ReadOnlyField(source='user.id')
     user_info = PublicUserSerializer(source='user', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    # Joined to the owner, the listing's expiry_date range makes SQLite scan
+    # users first and sort the page instead of walking the listing indexes
+    prefetch_relations = ('user',)
     
     class Meta:
         model = FoodItem
         fields = [
             'id', 'title', 'description', 'category', 'price',
             'is_free', 'location', 'expiry_date', 'image',
-            'image_url', 'created_at', 'updated_at', 'user', 'user_id', 'user_info'
+            'image_url', 'image_variants', 'created_at', 'updated_at', 'user', 'user_id', 'user_info'
         ]
         read_only_fields = ['user', 'user_id', 'created_at', 'updated_at']
+        # Grid cards: title, price and thumbnail
+        field_presets = {
+            'compact': ['id', 'title', 'category', 'price', 'is_free', 'expiry_date', 'image_url', 'image_variants'],
+        }
 
     def get_image_url(self, obj):
         if obj.image:
@@ -51,20 +150,25 @@ class FoodItemSerializer(serializers.ModelSerializer):
             validated_data['price'] = None
         return super().update(instance, validated_data)
 
-class FreeProductSerializer(serializers.ModelSerializer):
+class FreeProductSerializer(SparseFieldsetMixin, EagerLoadingMixin, SearchHighlightMixin, DistanceSerializerMixin, ImageVariantsMixin, ListingImageFieldMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.email')
     user_id = serializers.ReadOnlyField(source='user.id')
     user_info = PublicUserSerializer(source='user', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = FreeProduct
         fields = [
             'id', 'title', 'description', 'category', 'condition',
-            'location', 'image', 'image_url', 'created_at', 
+            'location', 'image', 'image_url', 'image_variants', 'created_at', 
             'updated_at', 'user', 'user_id', 'user_info', 'is_available'
         ]
         read_only_fields = ['user', 'user_id', 'created_at', 'updated_at']
+        # Grid cards: title, condition and thumbnail
+        field_presets = {
+            'compact': ['id', 'title', 'category', 'condition', 'image_url', 'image_variants'],
+        }
 
     def get_image_url(self, obj):
         if obj.image:
@@ -111,22 +215,30 @@ class FreeProductSerializer(serializers.ModelSerializer):
         print("Updated free product:", product)
         return product
 
-class DiscountProductSerializer(serializers.ModelSerializer):
+class DiscountProductSerializer(SparseFieldsetMixin, EagerLoadingMixin, SearchHighlightMixin, DistanceSerializerMixin, ImageVariantsMixin, ListingImageFieldMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.email')
     user_id = serializers.ReadOnlyField(source='user.id')
     user_info = PublicUserSerializer(source='user', read_only=True)
     image_url = serializers.SerializerMethodField()
-    discount_percentage = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    discount_percentage = serializers.FloatField(read_only=True)
     
     class Meta:
         model = DiscountProduct
         fields = [
             'id', 'title', 'description', 'category', 'condition',
             'original_price', 'discount_price', 'discount_percentage',
-            'location', 'image', 'image_url', 'created_at', 
+            'location', 'image', 'image_url', 'image_variants', 'created_at', 
             'updated_at', 'user', 'user_id', 'user_info', 'is_available'
         ]
         read_only_fields = ['user', 'user_id', 'created_at', 'updated_at']
+        # Grid cards: title, prices and thumbnail
+        field_presets = {
+            'compact': [
+                'id', 'title', 'category', 'condition', 'original_price', 'discount_price',
+                'discount_percentage', 'image_url', 'image_variants',
+            ],
+        }
 
     def get_image_url(self, obj):
         try:
@@ -140,16 +252,6 @@ class DiscountProductSerializer(serializers.ModelSerializer):
             print(f"Error getting image URL: {str(e)}")
             return None
 
-    def get_discount_percentage(self, obj):
-        try:
-            if obj.original_price and obj.discount_price:
-                discount = ((obj.original_price - obj.discount_price) / obj.original_price) * 100
-                return round(discount, 1)
-            return 0
-        except Exception as e:
-            print(f"Error calculating discount percentage: {str(e)}")
-            return 0
-
     def to_representation(self, instance):
         try:
             data = super().to_representation(instance)
@@ -215,9 +317,9 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = [
             'id', 'item_type', 'item_id', 'title', 'description',
-            'price', 'quantity', 'image_url', 'created_at', 'updated_at'
+            'price', 'quantity', 'image_url', 'is_available', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['is_available', 'created_at', 'updated_at']
 
     def validate(self, data):
         # Ensure price is an integer
@@ -230,5 +332,19 @@ class CartItemSerializer(serializers.ModelSerializer):
         # Ensure quantity is positive
         if data.get('quantity', 1) < 1:
             raise serializers.ValidationError("Quantity must be at least 1")
+
+        # Free and discount listings are single items
+        item_type = data.get('item_type', getattr(self.instance, 'item_type', None))
+        if item_type in CartItem.SINGLE_ITEM_TYPES and data.get('quantity', 1) > 1:
+            raise serializers.ValidationError({'quantity': "Free and discount items can only be bought one at a time"})
         
-        return data
\ No newline at end of file
+        return data
+
+class TransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transaction
+        fields = [
+            'id', 'item_type', 'item_id', 'title', 'price', 'quantity',
+            'payment_method', 'seller', 'created_at'
+        ]
+        read_only_fields = fields
@@ -1,6 +1,12 @@
-from django.db.models.signals import post_save, post_delete
+from functools import partial
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from .models import FoodItem, FreeProduct, DiscountProduct
+from . import search, listing_cache, images
+from .storage import release_on_commit
+from core import geo
 from users.utils import award_reputation_points, get_reputation_points_for_action
 import logging
 
@@ -88,4 +94,76 @@ def handle_discount_product_creation(sender, instance, created, **kwargs):
                 description="First item shared on Share&Save!",
                 related_item_id=instance.id,
                 related_item_type='discount'
-            )
\ No newline at end of file
+            )
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_save, sender=FreeProduct)
+@receiver(post_save, sender=DiscountProduct)
+def update_search_index(sender, instance, **kwargs):
+    search.index_listing(instance)
+
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_delete, sender=FreeProduct)
+@receiver(post_delete, sender=DiscountProduct)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_listing(instance)
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_save, sender=FreeProduct)
+@receiver(post_save, sender=DiscountProduct)
+def update_image_variants(sender, instance, **kwargs):
+    images.schedule_variants(instance)
+
+@receiver(pre_save, sender=FoodItem)
+@receiver(pre_save, sender=FreeProduct)
+@receiver(pre_save, sender=DiscountProduct)
+def geocode_location(sender, instance, **kwargs):
+    geo.assign_location(instance)
+
+@receiver(pre_save, sender=FoodItem)
+@receiver(pre_save, sender=FreeProduct)
+@receiver(pre_save, sender=DiscountProduct)
+def load_stored_image(sender, instance, **kwargs):
+    instance._previous_image = None
+    # A pending upload takes a new reference even when its bytes match
+    instance._image_uploaded = bool(instance.image) and not instance.image._committed
+    if instance.pk and not instance._state.adding:
+        stored = sender.objects.filter(pk=instance.pk).values_list('image', 'image_variants').first()
+        if stored is not None:
+            # image_variants is written by the background worker, so the
+            # copy on this instance may be stale; never save it back
+            instance._previous_image, instance.image_variants = stored
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_save, sender=FreeProduct)
+@receiver(post_save, sender=DiscountProduct)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous and (previous != instance.image.name or instance._image_uploaded):
+        release_on_commit(instance.image.storage, previous)
+
+@receiver(post_delete, sender=FoodItem)
+@receiver(post_delete, sender=FreeProduct)
+@receiver(post_delete, sender=DiscountProduct)
+def release_image_files(sender, instance, **kwargs):
+    storage, variants = instance.image.storage, instance.image_variants
+    transaction.on_commit(lambda: images.delete_variant_files(storage, variants))
+    release_on_commit(storage, instance.image.name)
+
+
+# Bumped once the write commits: a reader that misses in between would
+# otherwise cache the pre-commit rows under the new generation
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def invalidate_food_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(listing_cache.bump_generation, 'food'))
+
+@receiver(post_save, sender=FreeProduct)
+@receiver(post_delete, sender=FreeProduct)
+def invalidate_free_product_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(listing_cache.bump_generation, 'free'))
+
+@receiver(post_save, sender=DiscountProduct)
+@receiver(post_delete, sender=DiscountProduct)
+def invalidate_discount_product_listings(sender, instance, **kwargs):
+    transaction.on_commit(partial(listing_cache.bump_generation, 'discount'))
@@ -0,0 +1,98 @@
+"""
+Content-addressed storage for listing images.
+
+Files are stored once per distinct content under ``blobs/`` by their SHA-256
+digest, and ``MediaBlob`` rows count how many references point at each one.
+Uploading bytes that are already stored only bumps the count; deleting a
+reference removes the file once nothing points at it any more.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'blobs'
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def listing_image_storage():
+    return storages['listing_images']
+
+
+def hash_content(content):
+    """SHA-256 hex digest and size of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest(), size
+
+
+def release_on_commit(storage, name):
+    """Drop a reference to name once the current transaction commits"""
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def __init__(self, *args, **kwargs):
+        # Two uploads of the same bytes may race to write one blob; the
+        # contents are identical, so overwriting is harmless.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def blob_name(self, digest, name):
+        ext = os.path.splitext(name)[1].lower()
+        return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def is_blob(self, name):
+        return name.startswith(f'{BLOB_PREFIX}/')
+
+    def get_available_name(self, name, max_length=None):
+        # The stored name comes from the content hash in _save
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+        digest, size = hash_content(content)
+        blob_name = self.blob_name(digest, name)
+        try:
+            with transaction.atomic():
+                blob, created = MediaBlob.objects.get_or_create(
+                    sha256=digest, defaults={'name': blob_name, 'size': size}
+                )
+        except IntegrityError:
+            blob, created = MediaBlob.objects.get(sha256=digest), False
+        if not created:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+        # The file can be missing if the transaction that first stored it
+        # rolled back after writing
+        if not super().exists(blob.name):
+            super()._save(blob.name, content)
+        return blob.name
+
+    def retain(self, name):
+        """Add a reference to an already stored blob"""
+        from .models import MediaBlob
+        MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        if not name or not self.is_blob(name):
+            return super().delete(name)
+        from .models import MediaBlob
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+        super().delete(name)
@@ -0,0 +1,1523 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from notifications.models import Notification
+from users.models import User, ReputationHistory
+from users.utils import award_reputation_points
+from requests.models import Request
+from .models import FoodItem, FreeProduct, DiscountProduct, MediaBlob, CartItem, Transaction
+from . import listing_cache, images, expiry, fastpath, bulk, search
+from .pagination import encode_cursor_token
+from .storage import listing_image_storage
+from core import geo
+from core.renderers import FastJSONRenderer
+
+
+class ListingIndexTests(TestCase):
+    """Every listing filter path should be answered from an index, not a scan plus sort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='pass12345')
+        for i in range(30):
+            FoodItem.objects.create(
+                title=f'Food {i}', description='Fresh', category=FoodItem.CATEGORY_CHOICES[i % 7][0],
+                is_free=i % 2 == 0, price=None if i % 2 == 0 else 10,
+                location='Sylhet', expiry_date=date(2030, 1, 1), user=cls.user,
+            )
+            FreeProduct.objects.create(
+                title=f'Free {i}', description='Gently used', category='books',
+                condition='good', location='Sylhet', user=cls.user,
+            )
+            DiscountProduct.objects.create(
+                title=f'Discount {i}', description='Cheap', category='books',
+                condition='good', original_price=100, discount_price=50 + i,
+                location='Sylhet', user=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def listing_plan(self, url, table):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        listing_sql = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and f'FROM "{table}"' in q['sql']
+            and 'COUNT(' not in q['sql']
+        ]
+        self.assertTrue(listing_sql, f'no listing query captured for {url}')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + listing_sql[-1])
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, url, table):
+        plan = self.listing_plan(url, table)
+        self.assertIn('INDEX', plan, f'{url}: {plan}')
+        self.assertNotRegex(plan, rf'SCAN {table}(?! USING)', f'{url}: {plan}')
+        self.assertNotIn('TEMP B-TREE', plan, f'{url}: {plan}')
+
+    def test_food_listing_queries_use_indexes(self):
+        table = FoodItem._meta.db_table
+        for url in [
+            '/api/food/',
+            '/api/food/?category=fruits',
+            '/api/food/?free_only=true',
+        ]:
+            self.assertUsesIndex(url, table)
+
+    def test_free_product_listing_queries_use_indexes(self):
+        table = FreeProduct._meta.db_table
+        for url in [
+            '/api/free-products/',
+            '/api/free-products/?category=books',
+            '/api/free-products/?condition=good',
+        ]:
+            self.assertUsesIndex(url, table)
+
+    def test_discount_product_listing_queries_use_indexes(self):
+        table = DiscountProduct._meta.db_table
+        for url in [
+            '/api/discount-products/',
+            '/api/discount-products/?category=books',
+            '/api/discount-products/?condition=good',
+        ]:
+            self.assertUsesIndex(url, table)
+
+    def test_orderings_use_indexes(self):
+        for url, table in [
+            ('/api/food/?ordering=price', FoodItem._meta.db_table),
+            ('/api/food/?ordering=-price', FoodItem._meta.db_table),
+            ('/api/food/?ordering=expiry', FoodItem._meta.db_table),
+            ('/api/discount-products/?ordering=price', DiscountProduct._meta.db_table),
+            ('/api/discount-products/?ordering=discount', DiscountProduct._meta.db_table),
+            ('/api/free-products/?ordering=newest', FreeProduct._meta.db_table),
+        ]:
+            self.assertUsesIndex(url, table)
+
+    def test_discount_price_range_uses_index(self):
+        # A range filter cannot also serve the ORDER BY, but it must still
+        # narrow the rows through disc_price_idx rather than scanning.
+        table = DiscountProduct._meta.db_table
+        plan = self.listing_plan('/api/discount-products/?min_price=60&max_price=70', table)
+        self.assertIn('disc_price_idx', plan)
+
+
+class ListingPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        for i in range(5):
+            FreeProduct.objects.create(
+                title=f'Free {i}', description='Used', category='books', condition='good',
+                location='Sylhet', user=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_next_and_previous_round_trip(self):
+        pages, url = [], '/api/free-products/?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            url = data['next']
+        titles = [item['title'] for page in pages for item in page['results']]
+        self.assertEqual(titles, [f'Free {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual(back['results'], pages[1]['results'])
+        back = self.client.get(back['previous']).json()
+        self.assertEqual(back['results'], pages[0]['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_malformed_cursors_are_not_found(self):
+        tokens = [
+            'not-a-cursor',
+            encode_cursor_token(['a list']),
+            encode_cursor_token({'v': ['garbage', 1], 'r': False}),
+            encode_cursor_token({'v': [None, None], 'r': False}),
+            encode_cursor_token({'v': ['2024-01-01T00:00:00+00:00', 'x'], 'r': False}),
+            encode_cursor_token({'v': [['2024-01-01T00:00:00+00:00'], 1], 'r': False}),
+            encode_cursor_token({'v': ['2024-01-01T00:00:00+00:00'], 'r': False}),
+        ]
+        for token in tokens:
+            for endpoint in ('/api/food/', '/api/free-products/', '/api/discount-products/'):
+                response = self.client.get(endpoint, {'cursor': token})
+                self.assertEqual(response.status_code, 404, (endpoint, token))
+        response = self.client.get('/api/food/', {
+            'ordering': 'price', 'cursor': encode_cursor_token({'v': ['cheap', 1], 'r': False}),
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_malformed_search_cursors_are_not_found(self):
+        when = '2024-01-01T00:00:00+00:00'
+        cursors = [
+            {'s': 'newest', 'v': ['garbage'], 'k': 'food', 'id': 1},
+            {'s': 'newest', 'v': [when], 'k': 'food'},
+            {'s': 'newest', 'v': [when], 'k': 'food', 'id': 'x'},
+            {'s': 'newest', 'v': [when], 'k': 'boats', 'id': 1},
+            {'s': 'newest', 'v': [None], 'k': 'free', 'id': 1},
+            {'s': 'newest', 'v': when, 'k': 'free', 'id': 1},
+            {'s': 'relevance', 'v': ['high', when], 'k': 'free', 'id': 1},
+        ]
+        for cursor in cursors:
+            params = {'sort': cursor['s'], 'cursor': encode_cursor_token(cursor)}
+            if cursor['s'] == 'relevance':
+                params['search'] = 'free'
+            response = self.client.get('/api/search/', params)
+            self.assertEqual(response.status_code, 404, cursor)
+        valid = {'s': 'newest', 'v': [when], 'k': 'free', 'id': 1}
+        response = self.client.get('/api/search/', {'sort': 'newest', 'cursor': encode_cursor_token(valid)})
+        self.assertEqual(response.status_code, 200)
+
+
+class ListingOrderingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        for i, price in enumerate([30, None, 10, 20, None]):
+            FoodItem.objects.create(
+                title=f'Food {i}', description='Fresh', category='fruits',
+                is_free=price is None, price=price, location='Sylhet',
+                expiry_date=date.today() + timedelta(days=5 - i), user=cls.user,
+            )
+        for original, discounted in [(100, 90), (200, 50), (80, 60)]:
+            DiscountProduct.objects.create(
+                title=f'Item {original}', description='Used', category='books', condition='good',
+                original_price=original, discount_price=discounted, location='Sylhet', user=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def collect(self, url):
+        results = []
+        while url:
+            data = self.client.get(url).json()
+            results += data['results']
+            url = data['next']
+        return results
+
+    def test_food_price_order_pages_through_free_items(self):
+        results = self.collect('/api/food/?ordering=price&page_size=2')
+        self.assertEqual([item['price'] for item in results], [None, None, 10, 20, 30])
+        results = self.collect('/api/food/?ordering=-price&page_size=2')
+        self.assertEqual([item['price'] for item in results], [30, 20, 10, None, None])
+
+    def test_food_expiry_order(self):
+        results = self.collect('/api/food/?ordering=expiry&page_size=2')
+        self.assertEqual([item['title'] for item in results], [f'Food {i}' for i in range(4, -1, -1)])
+
+    def test_discount_order_uses_stored_percentage(self):
+        results = self.collect('/api/discount-products/?ordering=discount&page_size=1')
+        self.assertEqual([item['discount_percentage'] for item in results], [75.0, 25.0, 10.0])
+        product = DiscountProduct.objects.get(original_price=80)
+        product.title = 'Renamed'
+        with CaptureQueriesContext(connection) as ctx:
+            product.save()
+            self.assertEqual(product.discount_percentage, 25.0)
+        # Prices unchanged: the stored percentage is not read back
+        reads = [q['sql'] for q in ctx.captured_queries
+                 if q['sql'].startswith('SELECT') and 'discount_percentage' in q['sql']]
+        self.assertEqual(reads, [])
+        product.discount_price = 20
+        product.save()
+        self.assertEqual(product.discount_percentage, 75.0)
+        # Tenths round half up: 2/3 off is 66.7, 1/8 off is 12.5
+        for original, discounted, percentage in [(3, 1, 66.7), (8, 7, 12.5), (3, 2, 33.3)]:
+            product.original_price, product.discount_price = original, discounted
+            product.save()
+            self.assertEqual(product.discount_percentage, percentage)
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get('/api/free-products/?ordering=price')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('newest', response.json()['ordering'])
+
+
+class ListingSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='pass12345')
+
+    def make_free(self, title, description='Gently used'):
+        return FreeProduct.objects.create(
+            title=title, description=description, category='books',
+            condition='good', location='Sylhet', user=self.user,
+        )
+
+    def search(self, term):
+        response = self.client.get('/api/free-products/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_prefix_match_with_highlight(self):
+        self.make_free('Apple keyboard')
+        self.make_free('Desk lamp')
+        results = self.search('appl')
+        self.assertEqual([r['title'] for r in results], ['Apple keyboard'])
+        self.assertEqual(results[0]['search_highlight']['title'], '<mark>Apple</mark> keyboard')
+
+    def test_title_match_ranks_above_description_mentions(self):
+        self.make_free('Chair', 'A chair to go with a desk')
+        desk = self.make_free('Desk', 'Solid desk, desk drawer included, desk lamp')
+        results = self.search('desk')
+        self.assertEqual(results[0]['id'], desk.id)
+        self.assertEqual(len(results), 2)
+
+    def test_index_follows_updates_and_deletes(self):
+        product = self.make_free('Bicycle')
+        product.title = 'Tricycle'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.search('bicycle'), [])
+        self.assertEqual(len(self.search('tricycle')), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.search('tricycle'), [])
+
+    def test_no_search_has_no_highlight(self):
+        self.make_free('Apple keyboard')
+        results = self.client.get('/api/free-products/').json()['results']
+        self.assertNotIn('search_highlight', results[0])
+
+    def test_filters_apply_before_the_match_cap(self):
+        for i in range(3):
+            self.make_free(f'Lamp {i}', 'Lamp lamp lamp')
+        home = FreeProduct.objects.create(
+            title='Old thing', description='Also a lamp', category='home',
+            condition='good', location='Sylhet', user=self.user,
+        )
+        with mock.patch('products.search.MAX_RESULTS', 2):
+            self.assertEqual(len(self.search('lamp')), 2)
+            response = self.client.get('/api/free-products/', {'search': 'lamp', 'category': 'home'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [home.id])
+
+    def test_capped_matches_are_reported_as_truncated(self):
+        for i in range(3):
+            self.make_free(f'Lamp {i}')
+        with mock.patch('products.search.MAX_RESULTS', 2):
+            body = self.client.get('/api/free-products/', {'search': 'lamp'}).json()
+            self.assertTrue(body['truncated'])
+            self.assertEqual(len(body['results']), 2)
+            body = self.client.get('/api/search/', {'search': 'lamp'}).json()
+            self.assertTrue(body['truncated'])
+        with mock.patch('products.search.MAX_RESULTS', 3):
+            body = self.client.get('/api/free-products/', {'search': 'lamp', 'page_size': 1}).json()
+        self.assertFalse(body['truncated'])
+        self.assertFalse(self.client.get('/api/search/', {'search': 'lamp'}).json()['truncated'])
+
+    def test_missing_fts_table_is_remembered(self):
+        with mock.patch.object(search, '_fts_ready', False), \
+                mock.patch.object(connection.introspection, 'table_names') as table_names:
+            self.assertFalse(search.fts_available())
+        table_names.assert_not_called()
+
+
+class UnifiedSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='pass12345')
+        for i in range(4):
+            FoodItem.objects.create(
+                title=f'Rice bag {i}', description='Rice', category='other', price=5,
+                location='Sylhet', expiry_date=date(2030, 1, 1), user=cls.user,
+            )
+            FreeProduct.objects.create(
+                title=f'Rice cooker {i}', description='Works', category='home',
+                condition='good', location='Sylhet', user=cls.user,
+            )
+            DiscountProduct.objects.create(
+                title=f'Rice bowl set {i}', description='Ceramic', category='home',
+                condition='new', original_price=100, discount_price=40,
+                location='Sylhet', user=cls.user,
+            )
+        Request.objects.create(
+            title='Need rice', description='For a family', category='Other',
+            location='Sylhet', user=cls.user,
+        )
+
+    def collect(self, url):
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            results.extend(body['results'])
+            url = body['next']
+        return results
+
+    def test_merges_all_catalogs_without_duplicates(self):
+        results = self.collect('/api/search/?search=rice&page_size=5')
+        keys = [(r['item_type'], r['id']) for r in results]
+        self.assertEqual(len(keys), 12)
+        self.assertEqual(len(set(keys)), 12)
+        self.assertEqual({r['item_type'] for r in results}, {'food', 'free', 'discount'})
+
+    def test_newest_sort_is_globally_ordered(self):
+        results = self.collect('/api/search/?search=rice&sort=newest&page_size=5&types=food,free,discount,request')
+        self.assertEqual(len(results), 13)
+        created = [r['created_at'] for r in results]
+        self.assertEqual(created, sorted(created, reverse=True))
+        self.assertEqual(results[0]['item_type'], 'request')
+
+    def test_rejects_unknown_type(self):
+        self.assertEqual(self.client.get('/api/search/?types=boats').status_code, 400)
+
+
+class ListingQueryCountTests(TestCase):
+    """Listing cost must not grow with the number of rows or distinct owners."""
+
+    def setUp(self):
+        cache.clear()
+
+    def add_rows(self, count):
+        for i in range(count):
+            user = User.objects.create(email=f'user{User.objects.count()}@example.com')
+            FoodItem.objects.create(
+                title=f'Food {i}', description='Fresh', category='fruits', price=10,
+                location='Sylhet', expiry_date=date(2030, 1, 1), user=user,
+            )
+            FreeProduct.objects.create(
+                title=f'Free {i}', description='Used', category='books',
+                condition='good', location='Sylhet', user=user,
+            )
+            DiscountProduct.objects.create(
+                title=f'Discount {i}', description='Cheap', category='books',
+                condition='good', original_price=100, discount_price=50,
+                location='Sylhet', user=user,
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_listing_query_count_is_constant(self):
+        urls = ['/api/food/', '/api/free-products/', '/api/discount-products/']
+        self.add_rows(2)
+        small = [self.count_queries(url) for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_rows(15)
+        large = [self.count_queries(url) for url in urls]
+        self.assertEqual(small, large)
+
+    def data_queries(self, url):
+        """Queries other than the single ETag validator aggregate"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        queries = [q['sql'] for q in ctx.captured_queries]
+        validators = [q for q in queries if 'MAX(' in q and 'COUNT(' in q]
+        self.assertEqual(len(validators), 1, queries)
+        return [q for q in queries if q not in validators]
+
+    def test_listing_is_one_query(self):
+        self.add_rows(5)
+        # Food owners are prefetched (FoodItemSerializer.prefetch_relations),
+        # one extra query per page; the other listings join them.
+        cases = [('/api/food/?category=fruits', 2), ('/api/free-products/?category=books', 1),
+                 ('/api/discount-products/?category=books', 1)]
+        for url, expected in cases:
+            self.assertEqual(len(self.data_queries(url)), expected, url)
+
+    def test_debug_flag_requires_staff(self):
+        self.add_rows(2)
+        self.assertEqual(len(self.data_queries('/api/free-products/?debug=listing')), 1)
+
+    @override_settings(LISTING_DIAGNOSTICS_SAMPLE_RATE=1.0)
+    def test_sampled_request_collects_filter_counts(self):
+        self.add_rows(2)
+        with self.assertLogs('products.diagnostics', level='INFO') as logs:
+            self.client.get('/api/free-products/?category=books')
+        self.assertTrue(any('after category filter count: 2' in line for line in logs.output))
+
+    def add_shop_rows(self, owners, rows_per_owner):
+        for n in range(owners):
+            user = User.objects.create(email=f'shop{n}@example.com')
+            for i in range(rows_per_owner):
+                FoodItem.objects.create(
+                    title=f'Food {n}-{i}', description='Fresh', category='fruits', price=10,
+                    location='Sylhet', expiry_date=date(2030, 1, 1), user=user,
+                )
+
+    @override_settings(LISTING_FAST_PATH=False)
+    def test_serializer_path_query_count_is_fixed(self):
+        # The page, then its owners in one prefetch query
+        self.add_shop_rows(owners=3, rows_per_owner=4)
+        queries = self.data_queries('/api/food/?category=fruits')
+        self.assertEqual(len(queries), 2, queries)
+
+    @override_settings(LISTING_FAST_PATH=False)
+    def test_owner_block_is_shared_across_rows(self):
+        self.add_shop_rows(owners=2, rows_per_owner=3)
+        with mock.patch.object(User, 'get_reputation_level', autospec=True,
+                               return_value='New Member') as level:
+            results = self.client.get('/api/food/').json()['results']
+        self.assertEqual(len(results), 6)
+        # Built once per distinct owner, not once per row
+        self.assertEqual(level.call_count, 2)
+        emails = {r['user_info']['email'] for r in results}
+        self.assertEqual(emails, {'shop0@example.com', 'shop1@example.com'})
+
+
+class SparseFieldsetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        FoodItem.objects.create(
+            title='Rice', description='Fresh', category='other', price=10,
+            location='Sylhet', expiry_date=date(2030, 1, 1), user=cls.user,
+        )
+        Request.objects.create(title='Need a desk', description='Any', category='Other',
+                               location='Sylhet', user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_compact_preset_skips_pruned_fields_and_joins(self):
+        with mock.patch('users.serializers.PublicUserSerializer.to_representation') as nested, \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/food/?fields=compact')
+        nested.assert_not_called()
+        item = response.json()['results'][0]
+        self.assertEqual(set(item), {
+            'id', 'title', 'category', 'price', 'is_free', 'expiry_date', 'image_url', 'image_variants',
+        })
+        self.assertFalse([q for q in ctx.captured_queries if 'users_user' in q['sql']])
+
+    def test_fields_and_expand(self):
+        item = self.client.get('/api/food/?fields=id,title&expand=user_info').json()['results'][0]
+        self.assertEqual(set(item), {'id', 'title', 'user_info'})
+        self.assertEqual(item['user_info']['email'], 'owner@example.com')
+        rows = self.client.get('/api/requests/?fields=compact').json()
+        self.assertEqual(set(rows[0]), {'id', 'title', 'category', 'location', 'status', 'time'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/food/?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+    def test_expand_applies_to_the_default_field_set(self):
+        full = self.client.get('/api/food/').json()['results'][0]
+        item = self.client.get('/api/food/?expand=user_info').json()['results'][0]
+        self.assertEqual(item, full)
+        self.assertEqual(item['user_info']['email'], 'owner@example.com')
+        response = self.client.get('/api/food/?expand=secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['expand'])
+
+
+class ListingCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def make_free(self, title):
+        return FreeProduct.objects.create(
+            title=title, description='Used', category='books',
+            condition='good', location='Sylhet', user=self.user,
+        )
+
+    def test_repeat_request_is_served_without_queries(self):
+        self.make_free('Lamp')
+        first = self.client.get('/api/free-products/?category=books&condition=')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/free-products/?condition=&category=books')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(listing_cache.stats()['free'], {'hits': 1, 'misses': 1})
+
+    def test_writes_invalidate_only_their_listing(self):
+        product = self.make_free('Lamp')
+        self.client.get('/api/free-products/')
+        self.client.get('/api/food/')
+        product.title = 'Desk lamp'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        results = self.client.get('/api/free-products/').json()['results']
+        self.assertEqual(results[0]['title'], 'Desk lamp')
+        with self.assertNumQueries(0):
+            self.client.get('/api/food/')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.client.get('/api/free-products/').json()['results'], [])
+
+    def test_generation_moves_when_the_write_commits(self):
+        generation = listing_cache.get_generation('free')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_free('Lamp')
+            # A reader before the commit still caches under the old generation
+            self.assertEqual(listing_cache.get_generation('free'), generation)
+        self.assertNotEqual(listing_cache.get_generation('free'), generation)
+
+    def test_stats_require_admin(self):
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 401)
+
+
+class ListingFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        for title, category, condition, price in [
+            ('Novel', 'books', 'good', 80),
+            ('Atlas', 'books', 'like_new', 300),
+            ('Lamp', 'home', 'good', 3000),
+        ]:
+            DiscountProduct.objects.create(
+                title=title, description='Used', category=category, condition=condition,
+                original_price=price * 2, discount_price=price, location='Sylhet', user=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, facet):
+        return {entry.get('value', entry.get('min')): entry['count'] for entry in facet}
+
+    def test_counts_follow_current_filters_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/discount-products/facets/?category=books').json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(self.counts(data['category'])['books'], 2)
+        self.assertEqual(self.counts(data['category'])['home'], 0)
+        self.assertEqual(self.counts(data['condition'])['good'], 1)
+        self.assertEqual(self.counts(data['condition'])['like_new'], 1)
+        self.assertEqual(self.counts(data['discount_price'])[0], 1)
+        self.assertEqual(self.counts(data['discount_price'])[250], 1)
+        self.assertEqual(data['discount_price'][-1]['max'], None)
+
+    def test_food_facets_skip_expired_items(self):
+        for days, is_free in [(2, True), (5, False), (-1, True)]:
+            FoodItem.objects.create(
+                title='Milk', description='Fresh', category='dairy', is_free=is_free,
+                price=None if is_free else 10, location='Sylhet',
+                expiry_date=date.today() + timedelta(days=days), user=self.user,
+            )
+        data = self.client.get('/api/food/facets/').json()
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(self.counts(data['is_free']), {True: 1, False: 1})
+        self.assertNotIn('condition', data)
+
+    def test_cached_until_a_listing_changes(self):
+        first = self.client.get('/api/discount-products/facets/').json()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/discount-products/facets/').json(), first)
+        # The list and facets for the same query string do not share an entry
+        self.assertIn('results', self.client.get('/api/discount-products/').json())
+        with self.captureOnCommitCallbacks(execute=True):
+            DiscountProduct.objects.filter(title='Lamp').first().delete()
+        self.assertEqual(self.client.get('/api/discount-products/facets/').json()['total'], 2)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.product = FreeProduct.objects.create(
+            title='Lamp', description='Used', category='books',
+            condition='good', location='Sylhet', user=self.user,
+        )
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        etag = self.client.get('/api/free-products/')['ETag']
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/free-products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_cached_list_answers_304_without_queries(self):
+        etag = self.client.get('/api/free-products/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/free-products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_changes_on_update_and_delete(self):
+        first = self.client.get('/api/free-products/')['ETag']
+        self.product.title = 'Desk lamp'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        second = self.client.get('/api/free-products/', HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(second.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            other = FreeProduct.objects.create(
+                title='Chair', description='Used', category='books',
+                condition='good', location='Sylhet', user=self.user,
+            )
+        third = self.client.get('/api/free-products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertNotEqual(self.client.get('/api/free-products/')['ETag'], third)
+
+    def test_detail_honours_if_modified_since(self):
+        url = f'/api/free-products/{self.product.id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_list_and_detail_etags_follow_the_owner(self):
+        url = f'/api/free-products/{self.product.id}/'
+        etags = [self.client.get('/api/free-products/')['ETag'], self.client.get(url)['ETag']]
+        award_reputation_points(self.user, 'item_shared', 10, 'Shared')
+        points = User.objects.get(pk=self.user.pk).reputation_points
+        cache.clear()
+        response = self.client.get('/api/free-products/', HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(response.json()['results'][0]['user_info']['reputation_points'], points)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(response.json()['user_info']['reputation_points'], points)
+
+
+class ListingImageTestMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def upload(self, name='photo.png', size=(900, 600)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 80, 40)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_product(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FreeProduct.objects.create(
+                title='Lamp', description='Used', category='books', condition='good',
+                location='Sylhet', user=self.user, image=self.upload(),
+            )
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantTests(ListingImageTestMixin, TestCase):
+
+    def test_variants_generated_after_commit(self):
+        product = self.create_product()
+        product.refresh_from_db()
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual((variants['width'], variants['height']), (900, 600))
+        self.assertEqual([size['width'] for size in variants['sizes']], [320, 640])
+        self.assertTrue(variants['placeholder'].startswith('data:image/jpeg;base64,'))
+        storage = product.image.storage
+        for size in variants['sizes']:
+            self.assertTrue(storage.exists(size['webp']))
+            self.assertTrue(storage.exists(size['jpeg']))
+
+        data = self.client.get(f'/api/free-products/{product.id}/').json()['image_variants']
+        self.assertIn('.webp 320w', data['webp_srcset'])
+        self.assertTrue(data['jpeg_srcset'].startswith('http://testserver/media/'))
+
+    def test_variants_removed_with_listing(self):
+        product = self.create_product()
+        product.refresh_from_db()
+        names = images.variant_files(product.image_variants) | {product.image.name}
+        storage = product.image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertFalse(any(storage.exists(name) for name in names))
+
+    def test_listing_reports_none_until_ready(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            FreeProduct.objects.create(
+                title='Lamp', description='Used', category='books', condition='good',
+                location='Sylhet', user=self.user, image=self.upload(),
+            )
+        result = self.client.get('/api/free-products/').json()['results'][0]
+        self.assertIsNone(result['image_variants'])
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ListingFastPathTests(ListingImageTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_product()
+        FreeProduct.objects.create(
+            title='Chair \u2028 "চেয়ার"', description='Used', category='home', condition='fair',
+            location='Dhanmondi, Dhaka', user=self.user,
+        )
+        for price in (None, 15):
+            FoodItem.objects.create(
+                title='Rice', description='Fresh', category='other', is_free=price is None, price=price,
+                location='Sylhet', expiry_date=date(2030, 1, 1), user=self.user,
+            )
+        DiscountProduct.objects.create(
+            title='Desk', description='Solid', category='furniture', condition='good',
+            original_price=300, discount_price=120, location='Sylhet', user=self.user,
+        )
+
+    def fetch(self, url, fast):
+        cache.clear()
+        with override_settings(LISTING_FAST_PATH=fast), \
+                mock.patch.object(fastpath.RowWriter, 'write', autospec=True,
+                                  side_effect=fastpath.RowWriter.write) as write:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(write.called, fast and 'search=' not in url)
+        return response.content
+
+    def test_output_is_byte_identical_to_serializers(self):
+        urls = [
+            '/api/food/', '/api/food/?ordering=price&page_size=1', '/api/food/?fields=compact',
+            '/api/free-products/', '/api/free-products/?near=23.7461,90.3742&radius_km=5',
+            '/api/free-products/?fields=id,title&expand=user_info',
+            '/api/discount-products/', '/api/discount-products/?ordering=discount',
+            '/api/free-products/?search=lamp',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                body = self.fetch(url, fast=True)
+                self.assertEqual(body, self.fetch(url, fast=False))
+        listing = json.loads(self.fetch('/api/free-products/', fast=True))['results']
+        self.assertIn('.webp 320w', listing[1]['image_variants']['webp_srcset'])
+        nearby = json.loads(self.fetch(urls[4], fast=True))['results']
+        self.assertEqual([item['condition'] for item in nearby], ['fair'])
+        self.assertIn('distance_km', nearby[0])
+        # Cursor links built from row dicts address the same next page
+        next_url = json.loads(self.fetch('/api/food/?ordering=price&page_size=1', fast=True))['next']
+        self.assertEqual(self.fetch(next_url, fast=True), self.fetch(next_url, fast=False))
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'line\u2028break \u2029 "quoted" \\ টাকা \x07', 'when': datetime(2026, 1, 2, 3, 4, 5, 678901),
+            'day': date(2026, 1, 2), 'amount': Decimal('12.50'), 'ratio': 0.1, 'nested': [{'a': None, 'b': True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # Exponents are spelled differently but parse to the same values
+        big = {'values': [1e16, 1e-7]}
+        self.assertEqual(json.loads(FastJSONRenderer().render(big)), json.loads(JSONRenderer().render(big)))
+        for value in (float('nan'), float('inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'nested': [{'a': None, 'ratio': value}]})
+
+
+class ContentAddressedStorageTests(ListingImageTestMixin, TestCase):
+
+    def test_identical_upload_shares_blob_and_variants(self):
+        first = self.create_product()
+        second = self.create_product()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('blobs/'))
+        self.assertEqual(first.image_variants, second.image_variants)
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.ref_count, 2)
+
+        storage = first.image.storage
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        self.assertTrue(all(storage.exists(n) for n in images.variant_files(second.image_variants)))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_replacing_image_releases_old_blob(self):
+        product = self.create_product()
+        old_name = product.image.name
+        product.image = self.upload(size=(400, 300))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertNotEqual(product.image.name, old_name)
+        self.assertFalse(product.image.storage.exists(old_name))
+        product.refresh_from_db()
+        live = images.variant_files(product.image_variants) | {product.image.name}
+        self.assertEqual(set(MediaBlob.objects.values_list('name', flat=True)), live)
+
+    def test_dedupe_media_folds_legacy_duplicates(self):
+        storage = listing_image_storage()
+        data = self.upload().read()
+        ids = []
+        for path in ('free_products/1/kettle.jpg', 'free_products/2/kettle_dd7Bx0j.jpg'):
+            super(type(storage), storage)._save(path, ContentFile(data))
+            product = FreeProduct.objects.create(
+                title='Kettle', description='Used', category='books', condition='good',
+                location='Sylhet', user=self.user,
+            )
+            FreeProduct.objects.filter(pk=product.pk).update(image=path)
+            ids.append(product.pk)
+
+        call_command('dedupe_media', stdout=StringIO())
+
+        names = set(FreeProduct.objects.filter(pk__in=ids).values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        blob = MediaBlob.objects.get(name=names.pop())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertFalse(storage.exists('free_products/1/kettle.jpg'))
+
+    def test_dedupe_media_moves_a_shared_legacy_file_once(self):
+        storage = listing_image_storage()
+        path = 'free_products/3/lamp.jpg'
+        super(type(storage), storage)._save(path, ContentFile(self.upload().read()))
+        free = FreeProduct.objects.create(
+            title='Lamp', description='Used', category='books', condition='good',
+            location='Sylhet', user=self.user,
+        )
+        discount = DiscountProduct.objects.create(
+            title='Lamp', description='Used', category='books', condition='good',
+            original_price=100, discount_price=50, location='Sylhet', user=self.user,
+        )
+        FreeProduct.objects.filter(pk=free.pk).update(image=path)
+        DiscountProduct.objects.filter(pk=discount.pk).update(image=path)
+
+        out, err = StringIO(), StringIO()
+        call_command('dedupe_media', stdout=out, stderr=err)
+
+        names = {FreeProduct.objects.get(pk=free.pk).image.name,
+                 DiscountProduct.objects.get(pk=discount.pk).image.name}
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(storage.is_blob(name))
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 2)
+        self.assertFalse(storage.exists(path))
+        self.assertNotIn('missing', err.getvalue())
+        self.assertIn('Moved 2 images, 1 distinct', out.getvalue())
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class MediaServingTests(ListingImageTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product()
+        self.url = self.product.image.url
+        with open(self.product.image.path, 'rb') as f:
+            self.body = f.read()
+
+    def test_blob_served_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.body[:10])
+        self.assertEqual(response['Content-Range'], f'bytes 0-9/{len(self.body)}')
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(tail.streaming_content), self.body[-5:])
+        bad = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.body)}-')
+        self.assertEqual(bad.status_code, 416)
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel')
+    def test_accel_redirect_hands_off_to_proxy(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.product.image.name)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_rejects_paths_outside_media_root(self):
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/blobs/missing.png').status_code, 404)
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ImageUploadTests(ListingImageTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def post_product(self, image):
+        data = {
+            'title': 'Lamp', 'description': 'Used', 'category': 'books',
+            'condition': 'good', 'location': 'Sylhet', 'image': image,
+        }
+        return self.client.post('/api/free-products/', data, **self.auth)
+
+    def test_strips_exif_and_applies_orientation(self):
+        image = Image.new('RGB', (60, 40), (10, 120, 200))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        upload = SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+        response = self.post_product(upload)
+        self.assertEqual(response.status_code, 201, response.content)
+        product = FreeProduct.objects.get()
+        with product.image.open('rb') as f:
+            stored = Image.open(f)
+            self.assertNotIn('exif', stored.info)
+            self.assertEqual(stored.size, (40, 60))
+
+    def test_rejects_non_image_by_content(self):
+        upload = SimpleUploadedFile('photo.jpg', b'<?php echo 1; ?>' * 10, content_type='image/jpeg')
+        response = self.post_product(upload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Only JPEG, PNG and GIF', response.content.decode())
+        self.assertFalse(FreeProduct.objects.exists())
+
+    @override_settings(LISTING_IMAGE_MAX_PIXELS=100_000)
+    def test_rejects_images_over_pixel_budget(self):
+        response = self.post_product(self.upload(size=(900, 600)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('900x600', response.content.decode())
+
+    @override_settings(LISTING_IMAGE_MAX_BYTES=1024)
+    def test_rejects_images_over_byte_budget(self):
+        buffer = BytesIO()
+        Image.frombytes('RGB', (200, 200), os.urandom(200 * 200 * 3)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('noise.png', buffer.getvalue(), content_type='image/png')
+        response = self.post_product(upload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('larger than', response.content.decode())
+
+
+class RadiusSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        for title, location in (('Gulshan lamp', 'Gulshan 2, Dhaka'), ('Mirpur desk', 'Mirpur'),
+                                ('Sylhet chair', 'Zindabazar, Sylhet'), ('Nowhere', 'Somewhere else')):
+            FreeProduct.objects.create(
+                title=title, description='Used', category='books', condition='good',
+                location=location, user=cls.user,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_locations_are_geocoded_on_save(self):
+        product = FreeProduct.objects.get(title='Mirpur desk')
+        self.assertAlmostEqual(product.latitude, 23.8223)
+        self.assertEqual(product.geo_cell, geo.encode_geohash(product.latitude, product.longitude))
+        self.assertIsNone(FreeProduct.objects.get(title='Nowhere').latitude)
+
+    def test_near_filters_and_sorts_by_distance(self):
+        # Banani, a few hundred metres from Gulshan
+        response = self.client.get('/api/free-products/', {'near': '23.7937,90.4066', 'radius_km': 8})
+        results = response.json()['results']
+        self.assertEqual([r['title'] for r in results], ['Gulshan lamp', 'Mirpur desk'])
+        self.assertLess(results[0]['distance_km'], results[1]['distance_km'])
+        wide = self.client.get('/api/free-products/', {'near': '23.7937,90.4066', 'radius_km': 300})
+        self.assertEqual(len(wide.json()['results']), 3)
+        self.assertEqual(self.client.get('/api/free-products/', {'near': '91,0'}).status_code, 400)
+
+    def test_candidates_come_from_cell_range_scan(self):
+        cells = geo.covering_cells(23.7937, 90.4066, 8)
+        # The candidate query carries the view's filters
+        queryset = FreeProduct.objects.filter(is_available=True).exclude(latitude=None)
+        queryset = queryset.filter(geo.cell_filter(cells)).order_by().values_list('pk', 'latitude', 'longitude')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('free_geo_cell_idx', plan)
+
+    def test_capped_radius_search_is_reported_as_truncated(self):
+        params = {'near': '23.7937,90.4066', 'radius_km': 8}
+        with mock.patch('core.geo.MAX_RESULTS', 1):
+            body = self.client.get('/api/free-products/', params).json()
+        self.assertTrue(body['truncated'])
+        self.assertEqual([r['title'] for r in body['results']], ['Gulshan lamp'])
+        with mock.patch('core.geo.MAX_RESULTS', 2):
+            body = self.client.get('/api/free-products/', {**params, 'page_size': 1}).json()
+        self.assertFalse(body['truncated'])
+
+    def test_near_candidates_come_from_the_filtered_queryset(self):
+        home = FreeProduct.objects.create(
+            title='Gulshan sofa', description='Used', category='home', condition='good',
+            location='Gulshan 2, Dhaka', user=self.user,
+        )
+        params = {'near': '23.7937,90.4066', 'radius_km': 8, 'category': 'home'}
+        with mock.patch('core.geo.MAX_RESULTS', 1):
+            response = self.client.get('/api/free-products/', params)
+        self.assertEqual([r['id'] for r in response.json()['results']], [home.id])
+
+
+class FoodExpiryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        today = timezone.localdate()
+        cls.items = {}
+        for title, days in (('Old bread', -2), ('Milk', 1), ('Rice', 2), ('Honey', 200)):
+            cls.items[title] = FoodItem.objects.create(
+                title=title, description='Food', category='fruits', is_free=True,
+                location='Sylhet', expiry_date=today + timedelta(days=days), user=cls.user,
+            )
+        old = cls.items['Old bread']
+        CartItem.objects.create(user=cls.user, item_type='food', item_id=old.id,
+                                title=old.title, description='', price=0)
+        Notification.objects.create(user=cls.user, type='food', message='New food', related_item_id=old.id)
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, response):
+        return [item['title'] for item in response.json()['results']]
+
+    def test_listing_hides_expired_food(self):
+        self.assertEqual(self.titles(self.client.get('/api/food/')), ['Honey', 'Rice', 'Milk'])
+        old = self.items['Old bread']
+        self.assertEqual(self.client.get(f'/api/food/{old.id}/').status_code, 200)
+        response = self.client.get('/api/search/', {'types': 'food', 'sort': 'newest'})
+        self.assertEqual(self.titles(response), ['Honey', 'Rice', 'Milk'])
+
+    def test_expiring_soon_ordered_by_expiry(self):
+        self.assertEqual(self.titles(self.client.get('/api/food/expiring_soon/')), ['Milk', 'Rice'])
+        self.assertEqual(self.titles(self.client.get('/api/food/expiring_soon/?days=1')), ['Milk'])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/food/expiring_soon/')
+        sql = next(q['sql'] for q in ctx.captured_queries if 'expiry_date' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' | '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('food_active_expiry_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_sweeper_archives_and_cleans_up(self):
+        old = self.items['Old bread']
+        call_command('sweep_expired_food', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(FoodItem.objects.filter(is_archived=True)), [old])
+        self.assertFalse(CartItem.objects.filter(item_id=old.id).exists())
+        self.assertFalse(Notification.objects.filter(related_item_id=old.id).exists())
+        self.assertEqual(expiry.archive_expired(), 0)
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class BulkCreateTests(ListingImageTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        token = RefreshToken.for_user(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        User.objects.create(email='neighbour@example.com')
+
+    def food_items(self, count):
+        return [
+            {'title': f'Bread {i}', 'description': 'Fresh', 'category': 'fruits', 'is_free': True,
+             'location': 'Mirpur, Dhaka', 'expiry_date': '2030-01-01'}
+            for i in range(count)
+        ]
+
+    def test_json_bulk_create_runs_side_effects_once_per_batch(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                '/api/food/bulk/', json.dumps({'items': self.food_items(5)}),
+                content_type='application/json', **self.auth,
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()), 5)
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "products_fooditem"')]
+        self.assertEqual(len(inserts), 1)
+        user_updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "users_user"')]
+        self.assertEqual(len(user_updates), 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_items_shared, 5)
+        self.assertEqual(self.user.reputation_points, 5 * 10 + 25)
+        self.assertEqual(ReputationHistory.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertTrue(all(item.geo_cell for item in FoodItem.objects.all()))
+        search_hits = self.client.get('/api/food/', {'search': 'bread'}).json()['results']
+        self.assertEqual(len(search_hits), 5)
+
+    def test_multipart_bulk_create_with_images(self):
+        items = [
+            {'title': 'Lamp', 'description': 'Used', 'category': 'books', 'condition': 'good',
+             'location': 'Sylhet', 'image': 'photo_0'},
+            {'title': 'Desk', 'description': 'Used', 'category': 'books', 'condition': 'good',
+             'location': 'Sylhet'},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/free-products/bulk/',
+                {'items': json.dumps(items), 'photo_0': self.upload()}, **self.auth,
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        lamp = FreeProduct.objects.get(title='Lamp')
+        self.assertTrue(lamp.is_available)
+        self.assertTrue(lamp.image.name.startswith('blobs/'))
+        self.assertTrue(lamp.image_variants)
+        self.assertFalse(FreeProduct.objects.get(title='Desk').image)
+
+    def test_failed_batch_releases_images_and_keeps_the_cache(self):
+        product = self.create_product()
+        generation = listing_cache.get_generation('free')
+        item = {'title': 'Lamp', 'description': 'Used', 'category': 'books', 'condition': 'good',
+                'location': 'Sylhet', 'image': self.upload()}
+        with mock.patch.object(bulk.search, 'index_listings', side_effect=RuntimeError), \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                bulk.create_listings(FreeProduct, 'free', self.user, [item])
+        self.assertEqual(MediaBlob.objects.get(name=product.image.name).ref_count, 1)
+        self.assertEqual(FreeProduct.objects.count(), 1)
+        self.assertEqual(listing_cache.get_generation('free'), generation)
+
+    def test_bulk_create_validates_all_items_together(self):
+        items = self.food_items(3)
+        items[1]['expiry_date'] = 'soon'
+        response = self.client.post(
+            '/api/food/bulk/', json.dumps({'items': items}),
+            content_type='application/json', **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(list(errors), ['1'])
+        self.assertIn('expiry_date', errors['1'])
+        self.assertFalse(FoodItem.objects.exists())
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        cls.admin = User.objects.create(email='admin@example.com', is_staff=True)
+        for title in ('Rice', '=HYPERLINK("x")'):
+            FoodItem.objects.create(
+                title=title, description='Fresh, "local"\nrice', category='other', price=10,
+                location='Sylhet', expiry_date=date(2030, 1, 1), user=cls.user,
+            )
+        ReputationHistory.objects.create(user=cls.user, action='item_shared', points_earned=10,
+                                         description='Shared food item: Rice')
+
+    def get(self, url, user=None):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return self.client.get(url, **headers)
+
+    def test_staff_only(self):
+        self.assertEqual(self.get('/api/exports/food.ndjson').status_code, 401)
+        self.assertEqual(self.get('/api/exports/food.ndjson', self.user).status_code, 403)
+
+    def test_ndjson_streams_every_row(self):
+        response = self.get('/api/exports/food.ndjson', self.admin)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Rice', '=HYPERLINK("x")'])
+        self.assertEqual(rows[0]['expiry_date'], '2030-01-01')
+        self.assertEqual(rows[0]['user_id'], self.user.id)
+
+    def test_csv_quotes_and_neutralises_formulas(self):
+        response = self.get('/api/exports/food.csv?since=2000-01-01', self.admin)
+        self.assertIn('attachment; filename="food-', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(rows[0]['description'], 'Fresh, "local"\nrice')
+        self.assertEqual(rows[1]['title'], '\'=HYPERLINK("x")')
+
+    def test_since_and_unknown_names(self):
+        response = self.get('/api/exports/food.ndjson?since=2999-01-01', self.admin)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertEqual(self.get('/api/exports/boats.csv', self.admin).status_code, 400)
+        self.assertEqual(self.get('/api/exports/food.xml', self.admin).status_code, 400)
+        self.assertEqual(self.get('/api/exports/food.csv?since=soon', self.admin).status_code, 400)
+
+    def test_command_writes_in_chunks(self):
+        out, err = StringIO(), StringIO()
+        with mock.patch('django.db.models.query.QuerySet.iterator', autospec=True,
+                        side_effect=lambda qs, chunk_size=None: iter(list(qs))) as iterator:
+            call_command('export_data', 'reputation', '--chunk-size', '1', stdout=out, stderr=err)
+        self.assertEqual(iterator.call_args.kwargs['chunk_size'], 1)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), ReputationHistory.objects.count())
+        self.assertIn('Shared food item: Rice', [row['description'] for row in rows])
+        self.assertIn('Exported reputation', err.getvalue())
+
+
+class CartTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='buyer@example.com')
+        cls.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(cls.user).access_token}'}
+
+    def add(self, quantity=1, item_id=7, item_type='food'):
+        return self.client.post('/api/cart/', {
+            'item_type': item_type, 'item_id': item_id, 'title': 'Desk',
+            'description': 'Solid', 'price': 120, 'quantity': quantity,
+        }, content_type='application/json', **self.auth)
+
+    def test_add_is_one_statement_and_increments(self):
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.add(2)
+        cart_sql = [q['sql'] for q in ctx.captured_queries if 'products_cartitem' in q['sql']]
+        self.assertEqual(len(cart_sql), 1, cart_sql)
+        self.assertTrue(cart_sql[0].startswith('INSERT'))
+        self.assertEqual(first.status_code, 201)
+        second = self.add(3)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(second.json()['quantity'], 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_fallback_without_upsert_support(self):
+        with mock.patch('products.cart.UPSERT_VENDORS', ()):
+            self.assertEqual(self.add(1).status_code, 201)
+            response = self.add(4)
+        self.assertEqual(response.json()['quantity'], 5)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_invalid_quantity_is_rejected(self):
+        self.assertEqual(self.add(0).status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_single_items_hold_one_unit(self):
+        self.assertEqual(self.add(2, item_type='discount').status_code, 400)
+        self.assertEqual(self.add(1, item_type='discount').status_code, 201)
+        self.assertEqual(self.add(1, item_type='discount').json()['quantity'], 1)
+        with mock.patch('products.cart.UPSERT_VENDORS', ()):
+            self.assertEqual(self.add(1, item_type='discount').json()['quantity'], 1)
+        line = CartItem.objects.get()
+        response = self.client.patch(f'/api/cart/{line.id}/', {'quantity': 3},
+                                     content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 400)
+        response = self.sync([{'op': 'update', 'id': line.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 400)
+        add = {'op': 'add', 'item_type': 'discount', 'item_id': 7, 'title': 'Desk',
+               'description': 'Solid', 'price': 120}
+        self.assertEqual(self.sync([add, add]).json()[0]['quantity'], 1)
+        self.assertEqual(self.sync([{**add, 'quantity': 2}]).status_code, 400)
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+
+    def sync(self, operations):
+        return self.client.post('/api/cart/sync/', {'operations': operations},
+                                content_type='application/json', **self.auth)
+
+    def test_sync_applies_operations_in_order_with_bulk_statements(self):
+        lamp = self.add(1, item_id=1).json()
+        self.add(1, item_id=2)
+        bread = {'op': 'add', 'item_type': 'food', 'item_id': 3, 'title': 'Bread',
+                 'description': 'Fresh', 'price': 20}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.sync([
+                {'op': 'update', 'id': lamp['id'], 'quantity': 4},
+                {'op': 'remove', 'item_type': 'food', 'item_id': 2},
+                bread, {**bread, 'quantity': 2},
+                {'op': 'add', 'item_type': 'food', 'item_id': 1, 'title': 'Lamp',
+                 'description': 'Brass', 'price': 90},
+            ])
+        self.assertEqual(response.status_code, 200)
+        cart = {(line['item_type'], line['item_id']): line for line in response.json()}
+        self.assertEqual(set(cart), {('food', 1), ('food', 3)})
+        self.assertEqual((cart[('food', 1)]['quantity'], cart[('food', 1)]['price']), (5, 90))
+        self.assertEqual(cart[('food', 3)]['quantity'], 3)
+        writes = [q['sql'].split()[0] for q in ctx.captured_queries
+                  if 'products_cartitem' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT', 'UPDATE'])
+
+    def test_sync_is_all_or_nothing(self):
+        self.add(1, item_id=1)
+        response = self.sync([{'op': 'clear'}, {'op': 'update', 'id': 999, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['operations'])
+        self.assertEqual(CartItem.objects.count(), 1)
+        response = self.sync([{'op': 'update', 'item_type': 'food', 'item_id': 1, 'quantity': 0}])
+        self.assertEqual(response.status_code, 400)
+        with override_settings(CART_SYNC_MAX_OPERATIONS=1):
+            response = self.sync([{'op': 'clear'}, {'op': 'clear'}])
+        self.assertIn('At most 1 operations', response.json()['operations'])
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def line(self, item_type, item_id, price, quantity=1):
+        return CartItem.objects.create(
+            user=self.user, item_type=item_type, item_id=item_id, title='Old title',
+            description='Old', price=price, quantity=quantity,
+        )
+
+    def test_reads_revalidate_against_listings_in_constant_queries(self):
+        owner = User.objects.create(email='seller@example.com')
+        food = FoodItem.objects.create(
+            title='Mangoes', description='Ripe', category='fruits', price=40,
+            location='Sylhet', expiry_date=date(2030, 1, 1), user=owner,
+        )
+        expired = FoodItem.objects.create(
+            title='Bread', description='Stale', category='bakery', price=10,
+            location='Sylhet', expiry_date=date(2020, 1, 1), user=owner,
+        )
+        sold = FreeProduct.objects.create(
+            title='Chair', description='Used', category='furniture', condition='good',
+            location='Sylhet', user=owner, is_available=False,
+        )
+        discounts = [
+            DiscountProduct.objects.create(
+                title=f'Lamp {i}', description='Brass', category='home', condition='good',
+                original_price=100, discount_price=60 + i, location='Sylhet', user=owner,
+            )
+            for i in range(3)
+        ]
+        self.line('food', food.id, 30, quantity=2)
+        self.line('food', expired.id, 10)
+        self.line('free', sold.id, 0)
+        for discount in discounts:
+            self.line('discount', discount.id, 60)
+        self.line('discount', 9999, 80)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/cart/preflight/', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        listing_reads = [q['sql'] for q in ctx.captured_queries
+                         if q['sql'].startswith('SELECT') and '"products_' in q['sql']
+                         and 'products_cartitem' not in q['sql']]
+        self.assertEqual(len(listing_reads), 3, listing_reads)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1, writes)
+
+        data = response.json()
+        lines = {(line['item_type'], line['item_id']): line for line in data['items']}
+        self.assertEqual((lines[('food', food.id)]['title'], lines[('food', food.id)]['price']), ('Mangoes', 40))
+        self.assertEqual(lines[('discount', discounts[2].id)]['price'], 62)
+        self.assertTrue(lines[('discount', discounts[0].id)]['image_url'] is None)
+        unavailable = {(line['item_type'], line['item_id']) for line in data['items'] if not line['is_available']}
+        self.assertEqual(unavailable, {('food', expired.id), ('free', sold.id), ('discount', 9999)})
+        self.assertEqual(len(data['unavailable']), 3)
+        self.assertEqual(data['total'], 40 * 2 + 60 + 61 + 62)
+
+        # Nothing changed since, so a plain read writes nothing
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.client.get('/api/cart/', **self.auth).json()), 7)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+
+
+class CheckoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create(email='buyer@example.com')
+        cls.sellers = [User.objects.create(email=f'seller{i}@example.com') for i in range(2)]
+        cls.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(cls.buyer).access_token}'}
+
+    def setUp(self):
+        self.free = [
+            FreeProduct.objects.create(
+                title=f'Chair {i}', description='Used', category='furniture', condition='good',
+                location='Sylhet', user=self.sellers[i % 2],
+            )
+            for i in range(3)
+        ]
+        self.discount = DiscountProduct.objects.create(
+            title='Lamp', description='Brass', category='home', condition='good',
+            original_price=100, discount_price=60, location='Sylhet', user=self.sellers[0],
+        )
+        self.food = FoodItem.objects.create(
+            title='Mangoes', description='Ripe', category='fruits', price=40,
+            location='Sylhet', expiry_date=date(2030, 1, 1), user=self.sellers[1],
+        )
+        lines = [('free', item.id, 0, 1) for item in self.free]
+        lines += [('discount', self.discount.id, 55, 1), ('food', self.food.id, 40, 2)]
+        for item_type, item_id, price, quantity in lines:
+            CartItem.objects.create(
+                user=self.buyer, item_type=item_type, item_id=item_id, title='Cart title',
+                description='', price=price, quantity=quantity,
+            )
+        ReputationHistory.objects.all().delete()
+        User.objects.update(reputation_points=0, total_items_shared=0)
+
+    def checkout(self, payment_method='cod'):
+        return self.client.post('/api/cart/checkout/', {'payment_method': payment_method},
+                                content_type='application/json', **self.auth)
+
+    def test_checkout_records_transactions_in_fixed_statements(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.checkout()
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['total'], 60 + 40 * 2)
+        self.assertEqual(len(response.json()['transactions']), 5)
+        writes = [q['sql'].split()[0] for q in ctx.captured_queries
+                  if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        # Free and discount listings, transactions, history, counters, cart
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT', 'INSERT', 'UPDATE', 'UPDATE', 'UPDATE'])
+
+        self.assertFalse(FreeProduct.objects.filter(is_available=True).exists())
+        self.assertFalse(DiscountProduct.objects.get().is_available)
+        self.assertFalse(CartItem.objects.exists())
+        buyer = User.objects.get(pk=self.buyer.pk)
+        self.assertEqual((buyer.total_items_received, buyer.reputation_points), (5, 25))
+        counts = {user.pk: user.successful_transactions for user in User.objects.filter(pk__in=[s.pk for s in self.sellers])}
+        self.assertEqual(counts, {self.sellers[0].pk: 3, self.sellers[1].pk: 2})
+        self.assertEqual(ReputationHistory.objects.count(), 10)
+        self.assertEqual(Transaction.objects.filter(seller=self.sellers[1], item_type='food').get().quantity, 2)
+
+    def test_single_items_with_several_units_abort_the_checkout(self):
+        line = CartItem.objects.get(item_type='discount')
+        CartItem.objects.filter(pk=line.pk).update(quantity=7)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['unavailable'], [line.id])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertTrue(DiscountProduct.objects.get().is_available)
+
+    def test_unavailable_lines_abort_the_checkout(self):
+        self.free[1].is_available = False
+        self.free[1].save()
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        line = CartItem.objects.get(item_type='free', item_id=self.free[1].id)
+        self.assertEqual(response.json()['unavailable'], [line.id])
+        self.assertEqual(CartItem.objects.count(), 5)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertTrue(DiscountProduct.objects.get().is_available)
+
+    def test_invalid_payment_method_and_empty_cart(self):
+        self.assertEqual(self.checkout('cheque').status_code, 400)
+        CartItem.objects.all().delete()
+        self.assertEqual(self.checkout().status_code, 400)
@@ -0,0 +1,125 @@
+"""
+Streaming validation for listing image uploads.
+
+``ListingImageUploadHandler`` writes multipart file data to a temporary file
+chunk by chunk, so an upload never sits in memory whole. The first chunk is
+sniffed for a supported image signature and the running size is checked
+against ``LISTING_IMAGE_MAX_BYTES``; once a limit is hit the rest of the
+body is read and discarded. When the file is complete its header is parsed
+(without decoding pixels) to enforce ``LISTING_IMAGE_MAX_PIXELS``, and EXIF
+metadata is stripped.
+
+Rejected files are still handed to the parser, empty and carrying an
+``upload_error``, so the serializer can report the reason as a field error.
+"""
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Leading bytes of each accepted format, matching the extensions allowed on
+# the listing ImageFields
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+JPEG_QUALITY = 90
+
+
+class InvalidImageUpload(ValueError):
+    pass
+
+
+def get_max_bytes():
+    return getattr(settings, 'LISTING_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def get_max_pixels():
+    return getattr(settings, 'LISTING_IMAGE_MAX_PIXELS', 24_000_000)
+
+
+def sniff_format(header):
+    for signature, image_format in SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def inspect_image(upload):
+    """Check format and dimensions from the image header and strip metadata"""
+    upload.file.seek(0)
+    try:
+        image = Image.open(upload.file)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise InvalidImageUpload('Upload a valid image. The file is not a supported image.')
+
+    width, height = image.size
+    if width * height > get_max_pixels():
+        raise InvalidImageUpload(
+            f'Image is {width}x{height} pixels; the limit is {get_max_pixels():,} pixels.'
+        )
+    if image.format in ('JPEG', 'PNG') and 'exif' in image.info:
+        upload = strip_metadata(upload, image)
+    upload.file.seek(0)
+    return upload
+
+
+def strip_metadata(upload, image):
+    """
+    Re-encode image without EXIF, applying its orientation first. The decode
+    is bounded by the pixel budget checked before this runs.
+    """
+    stripped = TemporaryUploadedFile(upload.name, upload.content_type, 0, upload.charset)
+    try:
+        clean = ImageOps.exif_transpose(image)
+        if image.format == 'JPEG':
+            clean.save(stripped.file, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        else:
+            clean.save(stripped.file, 'PNG', optimize=True)
+    except OSError:
+        stripped.close()
+        raise InvalidImageUpload('Upload a valid image. The file could not be read.')
+    stripped.size = stripped.file.tell()
+    upload.close()
+    return stripped
+
+
+class ListingImageUploadHandler(TemporaryFileUploadHandler):
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        if start == 0 and sniff_format(raw_data) is None:
+            self.error = 'Upload a valid image. Only JPEG, PNG and GIF files are accepted.'
+        self.received += len(raw_data)
+        if self.received > get_max_bytes():
+            self.error = f'Image is larger than {filesizeformat(get_max_bytes())}.'
+        if self.error:
+            # Drop what was written; the remaining chunks are discarded
+            self.file.seek(0)
+            self.file.truncate()
+            return None
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.error is None:
+            self.file.size = file_size
+            try:
+                return inspect_image(self.file)
+            except InvalidImageUpload as e:
+                self.error = str(e)
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.size = 0
+        self.file.upload_error = self.error
+        return self.file
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FoodItemViewSet, FreeProductViewSet, DiscountProductViewSet, CartItemViewSet
+from .views import FoodItemViewSet, FreeProductViewSet, DiscountProductViewSet, CartItemViewSet, UnifiedSearchView, ListingCacheStatsView, ExportView
 
 router = DefaultRouter()
 router.register(r'food', FoodItemViewSet)
@@ -9,5 +9,8 @@ router.register(r'discount-products', DiscountProductViewSet)
 router.register(r'cart', CartItemViewSet, basename='cart')
 
 urlpatterns = [
+    path('search/', UnifiedSearchView.as_view(), name='unified_search'),
+    path('cache-stats/', ListingCacheStatsView.as_view(), name='listing_cache_stats'),
+    path('exports/<str:dataset>.<str:export_format>', ExportView.as_view(), name='export'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
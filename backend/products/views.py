@@ -1,19 +1,190 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
-from .models import FoodItem, FreeProduct, DiscountProduct, CartItem
-from .serializers import FoodItemSerializer, FreeProductSerializer, DiscountProductSerializer, CartItemSerializer
-from django.db import models
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from .models import FoodItem, FreeProduct, DiscountProduct, CartItem, FOOD_SORT_PRICE
+from .serializers import FoodItemSerializer, FreeProductSerializer, DiscountProductSerializer, CartItemSerializer, TransactionSerializer
+from .pagination import ListingCursorPagination, encode_cursor_token, decode_cursor_token
+from requests.models import Request
+from requests.serializers import RequestSerializer
+from . import search, listing_cache, expiry, bulk, facets, fastpath, cart, checkout
+from core import conditional, exports, geo
+from .diagnostics import ListingDiagnostics
+from .uploads import ListingImageUploadHandler
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
-class FoodItemViewSet(viewsets.ModelViewSet):
+class EagerLoadingViewMixin:
+    """Eager-loads the relations declared by the viewset's serializer"""
+
+    def eager_load(self, queryset):
+        setup = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        # Fields pruned by ?fields= need no joins
+        return setup(queryset, self.get_serializer().fields) if setup else queryset
+
+    def filter_queryset(self, queryset):
+        return self.eager_load(super().filter_queryset(queryset))
+
+class ListingCacheMixin:
+    """Serves repeated list requests from the listing response cache"""
+    cache_kind = None
+
+    def list(self, request, *args, **kwargs):
+        cached = listing_cache.get_cached(self.cache_kind, request)
+        if cached is not None:
+            # Stored validators are invalidated together with the data
+            validators = cached['validators']
+            response = conditional.not_modified(request, validators)
+            if response is not None:
+                return response
+            return conditional.add_validator_headers(Response(cached['data']), validators)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            listing_cache.store(self.cache_kind, request, {
+                'data': response.data,
+                'validators': getattr(response, 'validators', None),
+            })
+        return response
+
+class ListingFacetsMixin:
+    """GET <listing>/facets/: filter chip counts for the current filters, cached"""
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        cached = listing_cache.get_cached(self.cache_kind, request, scope='facets')
+        if cached is not None:
+            return Response(cached)
+        data = facets.facet_counts(self.get_queryset())
+        listing_cache.store(self.cache_kind, request, data, scope='facets')
+        return Response(data)
+
+class ListingSearchMixin:
+    """Full-text ?search= handling shared by the listing viewsets"""
+    search_text = None
+    cursor_ordering = None
+    # Set when the matches were cut at search.MAX_RESULTS; reported by the paginator
+    results_truncated = False
+
+    def apply_search(self, queryset):
+        search_text = self.request.query_params.get('search', None)
+        if not search_text:
+            return queryset
+        self.search_text = search_text
+        memo = self.__dict__.setdefault('_search_memo', {})
+        queryset, ordering = search.search_queryset(queryset, search_text, memo)
+        if search.is_truncated(memo):
+            self.results_truncated = True
+        if ordering:
+            # Rank order replaces newest-first while a search is active
+            self.cursor_ordering = ordering
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.search_text:
+            search.attach_highlights(page, self.search_text)
+        return page
+
+class ListingNearMixin(geo.NearFilterMixin):
+    """Radius search; nearest first unless a full-text search ranks the rows"""
+    def apply_near(self, queryset):
+        queryset = super().apply_near(queryset)
+        if self.near is not None and self.cursor_ordering is None:
+            self.cursor_ordering = ('distance_km', 'id')
+            queryset = queryset.order_by(*self.cursor_ordering)
+        return queryset
+
+class ListingOrderingMixin:
+    """
+    ?ordering=<key> server-side sort, each key backed by an index. A leading
+    '-' reverses the key's natural direction. An explicit ordering replaces
+    search rank and distance order.
+    """
+    ordering_options = {'newest': ('-created_at', '-id')}
+    # Expressions sorted on by alias, e.g. to give NULL prices a sort value
+    ordering_annotations = {}
+
+    def apply_ordering(self, queryset):
+        key = self.request.query_params.get('ordering', None)
+        if not key:
+            return queryset
+        ordering = self.ordering_options.get(key.lstrip('-'))
+        if ordering is None:
+            raise ValidationError({'ordering': f"Expected one of: {', '.join(self.ordering_options)}."})
+        if key.startswith('-'):
+            ordering = ListingCursorPagination.reverse_ordering(ordering)
+        annotations = {
+            alias: expression for alias, expression in self.ordering_annotations.items()
+            if any(field.lstrip('-') == alias for field in ordering)
+        }
+        self.cursor_ordering = ordering
+        return queryset.annotate(**annotations).order_by(*ordering)
+
+class ListingFastListMixin:
+    """Serves list pages through products.fastpath when the serializer allows it"""
+
+    def get_row_writer(self):
+        if not fastpath.is_enabled() or self.search_text:
+            # Search highlights are attached to model instances
+            return None
+        return fastpath.RowWriter.for_serializer(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        writer = self.get_row_writer()
+        if writer is None:
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        rows = writer.values(queryset, self.paginator.get_ordering(self))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(writer.write(page))
+
+class ListingUploadMixin:
+    """Streams multipart image uploads through ListingImageUploadHandler"""
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [ListingImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+class ListingBulkCreateMixin:
+    """POST <listing>/bulk/ creates several listings of the viewset's kind at once"""
+
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[MultiPartParser, FormParser, JSONParser])
+    def bulk_create(self, request):
+        items = bulk.parse_items(request)
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        instances = bulk.create_listings(
+            serializer.child.Meta.model, self.cache_kind, request.user, serializer.validated_data
+        )
+        return Response(
+            self.get_serializer(instances, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+class FoodItemViewSet(ListingUploadMixin, ListingBulkCreateMixin, ListingCacheMixin, ListingFacetsMixin, conditional.ConditionalGetMixin, EagerLoadingViewMixin, ListingSearchMixin, ListingNearMixin, ListingOrderingMixin, ListingFastListMixin, viewsets.ModelViewSet):
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ListingCursorPagination
     parser_classes = (MultiPartParser, FormParser)
+    cache_kind = 'food'
+    # Listings embed the owner's public profile
+    validator_related_field = 'user__updated_at'
+    ordering_options = {
+        'newest': ('-created_at', '-id'),
+        'price': ('sort_price', 'id'),
+        'expiry': ('expiry_date', 'id'),
+    }
+    ordering_annotations = {'sort_price': FOOD_SORT_PRICE}
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -61,7 +232,11 @@ class FoodItemViewSet(viewsets.ModelViewSet):
             )
 
     def get_queryset(self):
+        diagnostics = ListingDiagnostics(self.request, 'food items')
         queryset = FoodItem.objects.all()
+        if self.action in ('list', 'facets'):
+            # Expired food leaves the listing; owners can still fetch and delete it
+            queryset = expiry.active_food(queryset)
         
         # Filter by category
         category = self.request.query_params.get('category', None)
@@ -73,34 +248,53 @@ class FoodItemViewSet(viewsets.ModelViewSet):
         if free_only == 'true':
             queryset = queryset.filter(is_free=True)
         
-        # Search by title or description
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                models.Q(title__icontains=search) |
-                models.Q(description__icontains=search)
-            )
+        # Full-text search on title and description
+        queryset = self.apply_search(queryset)
         
         # Search by location
         location = self.request.query_params.get('location', None)
         if location:
             queryset = queryset.filter(location__icontains=location)
         
-        logger.info(f"Filtered queryset count: {queryset.count()}")
+        # Radius search around ?near=lat,lon
+        queryset = self.apply_near(queryset)
+        
+        # Server-side sort
+        queryset = self.apply_ordering(queryset)
+        
+        diagnostics.record('all', queryset)
         return queryset
 
     @action(detail=False, methods=['get'])
     def my_items(self, request):
         """Get food items listed by the current user"""
-        items = FoodItem.objects.filter(user=request.user)
+        items = self.eager_load(FoodItem.objects.filter(user=request.user))
         serializer = self.get_serializer(items, many=True)
         return Response(serializer.data)
 
-class FreeProductViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def expiring_soon(self, request):
+        """Unexpired food expiring within ?days= (default 3), soonest first"""
+        try:
+            days = int(request.query_params.get('days', expiry.EXPIRING_SOON_DAYS))
+        except ValueError:
+            raise ValidationError({'days': 'Expected a whole number of days.'})
+        days = max(0, min(days, expiry.MAX_EXPIRING_SOON_DAYS))
+        self.cursor_ordering = ('expiry_date', 'id')
+        queryset = self.eager_load(expiry.expiring_soon(FoodItem.objects.all(), days))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class FreeProductViewSet(ListingUploadMixin, ListingBulkCreateMixin, ListingCacheMixin, ListingFacetsMixin, conditional.ConditionalGetMixin, EagerLoadingViewMixin, ListingSearchMixin, ListingNearMixin, ListingOrderingMixin, ListingFastListMixin, viewsets.ModelViewSet):
     queryset = FreeProduct.objects.filter(is_available=True)
     serializer_class = FreeProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ListingCursorPagination
     parser_classes = (MultiPartParser, FormParser)
+    cache_kind = 'free'
+    # Listings embed the owner's public profile
+    validator_related_field = 'user__updated_at'
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -131,50 +325,52 @@ class FreeProductViewSet(viewsets.ModelViewSet):
             )
 
     def get_queryset(self):
+        diagnostics = ListingDiagnostics(self.request, 'free products')
         queryset = FreeProduct.objects.filter(is_available=True)
-        logger.info(f"Initial queryset count: {queryset.count()}")
+        diagnostics.record('initial', queryset)
         
         # Filter by category
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category=category)
-            logger.info(f"After category filter count: {queryset.count()}")
+            diagnostics.record('category', queryset)
         
         # Filter by condition
         condition = self.request.query_params.get('condition', None)
         if condition:
             queryset = queryset.filter(condition=condition)
-            logger.info(f"After condition filter count: {queryset.count()}")
+            diagnostics.record('condition', queryset)
         
-        # Search by title or description
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                models.Q(title__icontains=search) |
-                models.Q(description__icontains=search)
-            )
-            logger.info(f"After search filter count: {queryset.count()}")
+        # Full-text search on title and description
+        if self.request.query_params.get('search', None):
+            queryset = self.apply_search(queryset)
+            diagnostics.record('search', queryset)
         
         # Search by location
         location = self.request.query_params.get('location', None)
         if location:
             queryset = queryset.filter(location__icontains=location)
-            logger.info(f"After location filter count: {queryset.count()}")
+            diagnostics.record('location', queryset)
+        
+        # Radius search around ?near=lat,lon
+        queryset = self.apply_near(queryset)
+        if self.near:
+            diagnostics.record('near', queryset)
         
-        # Log all products in queryset
-        logger.info("Products in queryset:")
-        for product in queryset:
-            logger.info(f"Product ID: {product.id}, Title: {product.title}, Available: {product.is_available}")
+        # Server-side sort
+        queryset = self.apply_ordering(queryset)
+        
+        diagnostics.log_rows(queryset)
         
         return queryset
 
     def list(self, request, *args, **kwargs):
         logger.info("Listing free products")
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            logger.info(f"Returning {len(serializer.data)} products")
-            return Response(serializer.data)
+            return super().list(request, *args, **kwargs)
+        except (NotFound, ValidationError):
+            # Bad cursors and query params are client errors, not list failures
+            raise
         except Exception as e:
             logger.error(f"Error listing free products: {str(e)}")
             return Response(
@@ -187,9 +383,9 @@ class FreeProductViewSet(viewsets.ModelViewSet):
         """Get free products listed by the current user"""
         logger.info(f"Getting items for user: {request.user.email}")
         try:
-            items = FreeProduct.objects.filter(user=request.user)
-            logger.info(f"Found {items.count()} items for user")
+            items = self.eager_load(FreeProduct.objects.filter(user=request.user))
             serializer = self.get_serializer(items, many=True)
+            logger.info(f"Found {len(serializer.data)} items for user")
             return Response(serializer.data)
         except Exception as e:
             logger.error(f"Error getting user items: {str(e)}")
@@ -237,11 +433,20 @@ class FreeProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class DiscountProductViewSet(viewsets.ModelViewSet):
+class DiscountProductViewSet(ListingUploadMixin, ListingBulkCreateMixin, ListingCacheMixin, ListingFacetsMixin, conditional.ConditionalGetMixin, EagerLoadingViewMixin, ListingSearchMixin, ListingNearMixin, ListingOrderingMixin, ListingFastListMixin, viewsets.ModelViewSet):
     queryset = DiscountProduct.objects.filter(is_available=True)
     serializer_class = DiscountProductSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ListingCursorPagination
     parser_classes = (MultiPartParser, FormParser)
+    cache_kind = 'discount'
+    # Listings embed the owner's public profile
+    validator_related_field = 'user__updated_at'
+    ordering_options = {
+        'newest': ('-created_at', '-id'),
+        'price': ('discount_price', 'id'),
+        'discount': ('-discount_percentage', '-id'),
+    }
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -250,21 +455,21 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         try:
-            logger.info("Getting queryset for discount products")
+            diagnostics = ListingDiagnostics(self.request, 'discount products')
             queryset = DiscountProduct.objects.all()  # Remove the filter initially
-            logger.info(f"Initial queryset count: {queryset.count()}")
+            diagnostics.record('initial', queryset)
             
             # Filter by category
             category = self.request.query_params.get('category', None)
             if category:
                 queryset = queryset.filter(category=category)
-                logger.info(f"After category filter count: {queryset.count()}")
+                diagnostics.record('category', queryset)
             
             # Filter by condition
             condition = self.request.query_params.get('condition', None)
             if condition:
                 queryset = queryset.filter(condition=condition)
-                logger.info(f"After condition filter count: {queryset.count()}")
+                diagnostics.record('condition', queryset)
             
             # Filter by price range
             min_price = self.request.query_params.get('min_price', None)
@@ -273,26 +478,29 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(discount_price__gte=min_price)
             if max_price:
                 queryset = queryset.filter(discount_price__lte=max_price)
+            if min_price or max_price:
+                diagnostics.record('price', queryset)
             
-            # Search by title or description
-            search = self.request.query_params.get('search', None)
-            if search:
-                queryset = queryset.filter(
-                    models.Q(title__icontains=search) |
-                    models.Q(description__icontains=search)
-                )
-                logger.info(f"After search filter count: {queryset.count()}")
+            # Full-text search on title and description
+            if self.request.query_params.get('search', None):
+                queryset = self.apply_search(queryset)
+                diagnostics.record('search', queryset)
             
             # Search by location
             location = self.request.query_params.get('location', None)
             if location:
                 queryset = queryset.filter(location__icontains=location)
-                logger.info(f"After location filter count: {queryset.count()}")
+                diagnostics.record('location', queryset)
+            
+            # Radius search around ?near=lat,lon
+            queryset = self.apply_near(queryset)
+            if self.near:
+                diagnostics.record('near', queryset)
             
-            # Log all products in queryset
-            logger.info("Products in queryset:")
-            for product in queryset:
-                logger.info(f"Product ID: {product.id}, Title: {product.title}, Available: {product.is_available}")
+            # Server-side sort
+            queryset = self.apply_ordering(queryset)
+            
+            diagnostics.log_rows(queryset)
             
             return queryset
         except Exception as e:
@@ -304,10 +512,10 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         logger.info("Listing discount products")
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
-            logger.info(f"Returning {len(serializer.data)} products")
-            return Response(serializer.data)
+            return super().list(request, *args, **kwargs)
+        except (NotFound, ValidationError):
+            # Bad cursors and query params are client errors, not list failures
+            raise
         except Exception as e:
             logger.error(f"Error listing discount products: {str(e)}")
             logger.error(f"Error type: {type(e)}")
@@ -320,16 +528,10 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         logger.info(f"Creating discount product with data: {serializer.validated_data}")
         try:
-            # Log the request data
-            logger.info(f"Request data: {self.request.data}")
-            logger.info(f"Request FILES: {self.request.FILES}")
-            
             # Log the image file if present
             if 'image' in self.request.FILES:
                 image_file = self.request.FILES['image']
-                logger.info(f"Image file name: {image_file.name}")
-                logger.info(f"Image file size: {image_file.size}")
-                logger.info(f"Image content type: {image_file.content_type}")
+                logger.info(f"Image file: {image_file.name}, {image_file.size} bytes, {image_file.content_type}")
             
             product = serializer.save(user=self.request.user)
             logger.info(f"Successfully created discount product with ID: {product.id}")
@@ -343,7 +545,6 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         try:
             logger.info(f"Received request data: {request.data}")
-            logger.info(f"Request FILES: {request.FILES}")
             response = super().create(request, *args, **kwargs)
             logger.info(f"Created discount product: {response.data}")
             return response
@@ -361,9 +562,9 @@ class DiscountProductViewSet(viewsets.ModelViewSet):
         """Get discount products listed by the current user"""
         logger.info(f"Getting items for user: {request.user.email}")
         try:
-            items = DiscountProduct.objects.filter(user=request.user)
-            logger.info(f"Found {items.count()} items for user")
+            items = self.eager_load(DiscountProduct.objects.filter(user=request.user))
             serializer = self.get_serializer(items, many=True)
+            logger.info(f"Found {len(serializer.data)} items for user")
             return Response(serializer.data)
         except Exception as e:
             logger.error(f"Error getting user items: {str(e)}")
@@ -423,21 +624,14 @@ class CartItemViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         try:
-            # Check if item already exists in cart
-            existing_item = CartItem.objects.filter(
-                user=request.user,
-                item_type=request.data.get('item_type'),
-                item_id=request.data.get('item_id')
-            ).first()
-
-            if existing_item:
-                # Update quantity if item exists
-                existing_item.quantity += int(request.data.get('quantity', 1))
-                existing_item.save()
-                serializer = self.get_serializer(existing_item)
-                return Response(serializer.data)
-
-            return super().create(request, *args, **kwargs)
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            # One upsert: a new line, or more of an item already in the cart
+            item, created = cart.add_item(request.user, serializer.validated_data)
+            return Response(
+                self.get_serializer(item).data,
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+            )
         except Exception as e:
             logger.error(f"Error adding item to cart: {str(e)}")
             return Response(
@@ -445,6 +639,45 @@ class CartItemViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def list(self, request, *args, **kwargs):
+        # Lines are checked against the live listings on every read
+        items = cart.revalidate(self.get_queryset(), request)
+        return Response(self.get_serializer(items, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def preflight(self, request):
+        """Revalidated cart with the server-side total, checked before checkout"""
+        items = cart.revalidate(self.get_queryset(), request)
+        return Response({
+            'items': self.get_serializer(items, many=True).data,
+            'total': cart.cart_total(request.user),
+            'unavailable': [item.id for item in items if not item.is_available],
+        })
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """Buy every line in the cart; returns the recorded transactions and their total"""
+        payment_method = checkout.parse_payment_method(request.data.get('payment_method'))
+        try:
+            transactions = checkout.checkout(request.user, payment_method)
+        except checkout.CheckoutError as e:
+            return Response(
+                {'error': str(e), 'unavailable': e.unavailable},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({
+            'transactions': TransactionSerializer(transactions, many=True).data,
+            'total': sum(sale.price * sale.quantity for sale in transactions),
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """Apply an ordered batch of add/update/remove/clear operations; returns the cart"""
+        data = request.data
+        operations = cart.parse_operations(data.get('operations') if isinstance(data, dict) else data)
+        items = cart.sync(request.user, operations)
+        return Response(self.get_serializer(items, many=True).data)
+
     def update(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -475,4 +708,101 @@ class CartItemViewSet(viewsets.ModelViewSet):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            ) 
\ No newline at end of file
+            ) 
+
+class UnifiedSearchView(APIView):
+    """
+    Search food, free products, discount products and, on request, community
+    requests in one call. Results from every catalog are merged server side
+    into a single stream ordered by relevance or by newest first. A catalog
+    with more than search.MAX_RESULTS matches contributes only the best
+    ranked ones, and the response then says ``"truncated": true``.
+    """
+    permission_classes = [permissions.AllowAny]
+    sources = {
+        'food': (lambda: expiry.active_food(FoodItem.objects.all()), FoodItemSerializer),
+        'free': (lambda: FreeProduct.objects.filter(is_available=True), FreeProductSerializer),
+        'discount': (lambda: DiscountProduct.objects.filter(is_available=True), DiscountProductSerializer),
+        'request': (lambda: Request.objects.all(), RequestSerializer),
+    }
+    default_types = ['food', 'free', 'discount']
+    sort_options = ('relevance', 'newest')
+
+    def get(self, request):
+        text = request.query_params.get('search', None) or request.query_params.get('q', '')
+        sort = request.query_params.get('sort', 'relevance')
+        if sort not in self.sort_options:
+            raise ValidationError({'sort': f"Must be one of: {', '.join(self.sort_options)}"})
+
+        types = request.query_params.get('types', None)
+        types = [t for t in types.split(',') if t] if types else self.default_types
+        unknown = [t for t in types if t not in self.sources]
+        if unknown:
+            raise ValidationError({'types': f"Unknown types: {', '.join(unknown)}"})
+
+        cursor = None
+        token = request.query_params.get('cursor', None)
+        if token:
+            try:
+                cursor = decode_cursor_token(token)
+            except ValueError:
+                raise NotFound('Invalid cursor')
+
+        querysets = {
+            kind: self.sources[kind][0]().select_related('user')
+            for kind in search.KIND_ORDER if kind in types
+        }
+        page_size = ListingCursorPagination().get_page_size(request)
+        try:
+            rows, next_cursor, truncated = search.merged_search(querysets, text, sort, cursor, page_size)
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+        if text:
+            for kind in querysets:
+                search.attach_highlights([obj for k, obj in rows if k == kind], text)
+
+        context = {'request': request}
+        results = []
+        for kind, obj in rows:
+            data = self.sources[kind][1](obj, context=context).data
+            data['item_type'] = kind
+            if hasattr(obj, 'search_highlight'):
+                data.setdefault('search_highlight', obj.search_highlight)
+            results.append(data)
+
+        next_link = None
+        if next_cursor is not None:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_cursor_token(next_cursor)
+            )
+        return Response({'next': next_link, 'truncated': truncated, 'results': results})
+
+
+class ListingCacheStatsView(APIView):
+    """Hit/miss counters of the listing response cache, for metrics scraping"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(listing_cache.stats())
+
+
+class ExportView(APIView):
+    """Streams a whole dataset as NDJSON or CSV for reporting (see core/exports.py)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body format comes from the URL; errors still render as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset, export_format):
+        try:
+            since = exports.parse_since(request.query_params.get('since'))
+            blocks = exports.stream_export(dataset, export_format, since)
+        except exports.ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"Exporting {dataset} as {export_format} for {request.user}")
+        response = StreamingHttpResponse(blocks, content_type=exports.FORMATS[export_format])
+        filename = f'{dataset}-{timezone.now():%Y%m%d}.{export_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
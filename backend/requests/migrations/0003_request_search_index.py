@@ -0,0 +1,54 @@
+from django.db import migrations
+
+FTS_TABLE = 'products_listing_fts'
+
+PG_VECTOR = (
+    "(setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B'))"
+)
+
+
+def index_requests(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        if FTS_TABLE not in connection.introspection.table_names():
+            return
+        Request = apps.get_model('requests', 'Request')
+        rows = [
+            # 'request' is kind code 0 in products.search
+            (pk * 4, title, description, 'request', pk)
+            for pk, title, description in Request.objects.values_list('pk', 'title', 'description')
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, kind, item_id) '
+                f'VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS request_search_gin ON requests_request USING GIN ({PG_VECTOR})'
+            )
+
+
+def unindex_requests(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            if FTS_TABLE in connection.introspection.table_names():
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE kind = 'request'")
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS request_search_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0002_alter_request_category_alter_request_status'),
+        ('products', '0009_listing_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_requests, unindex_requests),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core import geo
+
+GEOCODED_MODELS = ['Request']
+
+
+def geocode_existing_rows(apps, schema_editor):
+    # One update per distinct location string
+    for model_name in GEOCODED_MODELS:
+        model = apps.get_model('requests', model_name)
+        locations = model.objects.order_by().values_list('location', flat=True).distinct()
+        for location in list(locations):
+            point = geo.geocode(location)
+            if point is not None:
+                model.objects.filter(location=location).update(
+                    latitude=point[0], longitude=point[1], geo_cell=geo.encode_geohash(*point),
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0003_request_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='request_geo_cell_idx'),
+        ),
+        migrations.RunPython(geocode_existing_rows, migrations.RunPython.noop),
+    ]
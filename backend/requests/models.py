@@ -18,6 +18,10 @@ class Request(models.Model):
     description = models.TextField()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='requests')
     location = models.CharField(max_length=200)
+    # Resolved from location by core.geo; null when the place is unknown
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.CharField(max_length=12, blank=True, default='')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Active')
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -28,3 +32,6 @@ class Request(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='request_geo_cell_idx'),
+        ]
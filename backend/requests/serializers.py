@@ -3,6 +3,8 @@ from .models import Request
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
+from core.geo import DistanceSerializerMixin
+from core.fieldsets import SparseFieldsetMixin
 
 User = get_user_model()
 
@@ -11,7 +13,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email']
 
-class RequestSerializer(serializers.ModelSerializer):
+class RequestSerializer(SparseFieldsetMixin, DistanceSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     user_id = serializers.ReadOnlyField(source='user.id')
     time = serializers.SerializerMethodField()
@@ -20,6 +22,9 @@ class RequestSerializer(serializers.ModelSerializer):
         model = Request
         fields = ['id', 'user', 'user_id', 'title', 'description', 'category', 'location', 'status', 'created_at', 'time']
         read_only_fields = ['user', 'user_id', 'status', 'created_at']
+        field_presets = {
+            'compact': ['id', 'title', 'category', 'location', 'status', 'time'],
+        }
 
     def get_time(self, obj):
         if not obj.created_at:
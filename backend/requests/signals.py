@@ -0,0 +1,17 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from products import search
+from core import geo
+from .models import Request
+
+@receiver(pre_save, sender=Request)
+def geocode_location(sender, instance, **kwargs):
+    geo.assign_location(instance)
+
+@receiver(post_save, sender=Request)
+def update_search_index(sender, instance, **kwargs):
+    search.index_listing(instance)
+
+@receiver(post_delete, sender=Request)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_listing(instance)
@@ -1,3 +1,34 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from users.models import User
+from .models import Request
+
+
+class RequestNearTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        Request.objects.create(title='Need a desk', description='Any', category='Other',
+                               location='Dhanmondi, Dhaka', user=cls.user)
+        Request.objects.create(title='Need a chair', description='Any', category='Other',
+                               location='Zindabazar, Sylhet', user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_near_filters_requests_by_distance(self):
+        response = self.client.get('/api/requests/', {'near': '23.7461,90.3742', 'radius_km': 2})
+        self.assertEqual([r['title'] for r in response.json()], ['Need a desk'])
+        self.assertEqual(self.client.get('/api/requests/', {'near': 'dhaka'}).status_code, 400)
+
+    def test_capped_radius_search_sets_truncated_header(self):
+        params = {'near': '23.7461,90.3742', 'radius_km': 300}
+        with mock.patch('core.geo.MAX_RESULTS', 1):
+            response = self.client.get('/api/requests/', params)
+        self.assertEqual([r['title'] for r in response.json()], ['Need a desk'])
+        self.assertEqual(response['X-Results-Truncated'], 'true')
+        self.assertNotIn('X-Results-Truncated', self.client.get('/api/requests/', params))
@@ -3,7 +3,11 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from .models import Request
 from .serializers import RequestSerializer
+from products.diagnostics import ListingDiagnostics
+from core.conditional import ConditionalGetMixin
+from core.geo import NearFilterMixin
 import logging
+from django.utils import timezone
 from django.db import models
 
 logger = logging.getLogger(__name__)
@@ -22,25 +26,40 @@ class IsAuthenticatedOrReadOnly(permissions.BasePermission):
         # Require authentication for other methods
         return request.user and request.user.is_authenticated
 
-class RequestViewSet(viewsets.ModelViewSet):
+class RequestViewSet(ConditionalGetMixin, NearFilterMixin, viewsets.ModelViewSet):
     queryset = Request.objects.all().order_by('-created_at')
     serializer_class = RequestSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Requests embed their author
+    validator_related_field = 'user__updated_at'
+
+    def get_validator_extra(self):
+        # The serializer's relative 'time' field ("5m ago") changes every minute
+        return (timezone.now().strftime('%Y-%m-%dT%H:%M'),)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Requests are not paginated, so a radius search cut at
+        # geo.MAX_RESULTS is flagged in a header instead of the body
+        if self.results_truncated:
+            response['X-Results-Truncated'] = 'true'
+        return response
+
     def get_queryset(self):
+        diagnostics = ListingDiagnostics(self.request, 'requests')
         queryset = Request.objects.all()
-        logger.info(f"Initial queryset count: {queryset.count()}")
+        diagnostics.record('initial', queryset)
         
         # Filter by category
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category=category)
-            logger.info(f"After category filter count: {queryset.count()}")
+            diagnostics.record('category', queryset)
         
         # Search by title or description
         search = self.request.query_params.get('search', None)
@@ -49,13 +68,19 @@ class RequestViewSet(viewsets.ModelViewSet):
                 models.Q(title__icontains=search) |
                 models.Q(description__icontains=search)
             )
-            logger.info(f"After search filter count: {queryset.count()}")
+            diagnostics.record('search', queryset)
         
         # Search by location
         location = self.request.query_params.get('location', None)
         if location:
             queryset = queryset.filter(location__icontains=location)
-            logger.info(f"After location filter count: {queryset.count()}")
+            diagnostics.record('location', queryset)
+        
+        # Radius search around ?near=lat,lon, nearest first
+        queryset = self.apply_near(queryset)
+        if self.near:
+            diagnostics.record('near', queryset)
+            return queryset.order_by('distance_km', 'id')
         
         return queryset.order_by('-created_at')
 
@@ -32,6 +32,8 @@ class User(AbstractUser):
     total_items_shared = models.IntegerField(default=0)
     total_items_received = models.IntegerField(default=0)
     successful_transactions = models.IntegerField(default=0)
+    # Moves with the public profile; listings fold it into their ETags
+    updated_at = models.DateTimeField(auto_now=True)
     
     objects = UserManager()
 
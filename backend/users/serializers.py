@@ -127,6 +127,14 @@ class PublicUserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'first_name', 'last_name', 'full_name', 'reputation_points',
                  'reputation_level', 'reputation_badges', 'total_items_shared', 'successful_transactions']
     
+    def to_representation(self, instance):
+        # Listings embed the same few owners over and over; build each
+        # owner's block (and its reputation level/badges) once per response.
+        cache = self.context.setdefault('_public_user_cache', {})
+        if instance.pk not in cache:
+            cache[instance.pk] = super().to_representation(instance)
+        return dict(cache[instance.pk])
+
     def get_full_name(self, obj):
         if obj.first_name and obj.last_name:
             return f"{obj.first_name} {obj.last_name}"
@@ -1,3 +1,61 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from .models import User, ReputationHistory
+from .utils import award_many, award_reputation_points
+
+
+class PublicUserTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='owner@example.com')
+
+    def test_public_user_etag_tracks_reputation(self):
+        url = f'/api/users/public/{self.user.id}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        User.objects.filter(pk=self.user.pk).update(reputation_points=500)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ReputationAwardTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='sharer@example.com', password='pass12345')
+        self.other = User.objects.create(email='other@example.com')
+
+    def test_award_increments_only_reputation_columns(self):
+        stale = User.objects.get(pk=self.user.pk)
+        self.assertEqual(award_reputation_points(self.user, 'item_shared', 10, 'Shared'), 10)
+        with CaptureQueriesContext(connection) as ctx:
+            # A second copy of the row awarding concurrently keeps both awards
+            total = award_reputation_points(stale, 'transaction_completed', 15, 'Sold')
+        update = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE'))
+        self.assertNotIn('password', update)
+        self.assertIn('"reputation_points" = ("users_user"."reputation_points" + 15)', update)
+        self.assertEqual(total, 25)
+        self.assertEqual((stale.reputation_points, stale.successful_transactions), (25, 1))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.reputation_points, 25)
+        self.assertEqual(ReputationHistory.objects.filter(user=self.user).count(), 2)
+
+    def test_award_many_is_one_insert_and_one_update(self):
+        events = [
+            {'user': self.user, 'action': 'item_shared', 'points': 10, 'description': 'Shared'},
+            {'user': self.user, 'action': 'positive_feedback', 'points': 20, 'description': 'Thanks'},
+            {'user_id': self.other.pk, 'action': 'item_received', 'points': 5, 'description': 'Got it'},
+            {'user_id': self.other.pk, 'action': 'item_received', 'points': 5, 'description': 'Got it'},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            totals = award_many(events)
+        writes = [q['sql'].split()[0] for q in ctx.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE')]
+        self.assertEqual(writes, ['INSERT', 'UPDATE'])
+        self.assertEqual(totals[self.other.pk], {'reputation_points': 10, 'total_items_received': 2})
+        self.assertEqual((self.user.reputation_points, self.user.total_items_shared), (30, 1))
+        other = User.objects.get(pk=self.other.pk)
+        self.assertEqual((other.reputation_points, other.total_items_received, other.total_items_shared), (10, 2, 0))
+        self.assertEqual(ReputationHistory.objects.count(), 4)
+        self.assertEqual(award_many([]), {})
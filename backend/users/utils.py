@@ -1,10 +1,32 @@
 from django.db import transaction
-from .models import ReputationHistory
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import ReputationHistory, User
+
+# Per-action counters kept on the user next to reputation_points
+ACTION_COUNTERS = {
+    'item_shared': 'total_items_shared',
+    'item_received': 'total_items_received',
+    'transaction_completed': 'successful_transactions',
+}
+
+def award_increments(action, points):
+    """Column increments one award makes on the user row"""
+    increments = {'reputation_points': points}
+    counter = ACTION_COUNTERS.get(action)
+    if counter:
+        increments[counter] = 1
+    return increments
 
 def award_reputation_points(user, action, points, description, related_item_id=None, related_item_type=None):
     """
-    Award reputation points to a user for a specific action
+    Award reputation points to a user for a specific action.
+
+    The points and counters are added in the database, so concurrent awards
+    all count and no other column is written. Returns the user's new
+    reputation total, reloaded together with the counters.
     """
+    increments = award_increments(action, points)
     with transaction.atomic():
         # Create reputation history entry
         ReputationHistory.objects.create(
@@ -15,21 +37,63 @@ def award_reputation_points(user, action, points, description, related_item_id=N
             related_item_id=related_item_id,
             related_item_type=related_item_type
         )
-        
-        # Update user's total reputation points
-        user.reputation_points += points
-        
-        # Update specific counters based on action
-        if action == 'item_shared':
-            user.total_items_shared += 1
-        elif action == 'item_received':
-            user.total_items_received += 1
-        elif action == 'transaction_completed':
-            user.successful_transactions += 1
-        
-        user.save()
-        
-        return user.reputation_points
+        for field, amount in increments.items():
+            setattr(user, field, F(field) + amount)
+        user.save(update_fields=[*increments, 'updated_at'])
+        user.refresh_from_db(fields=list(increments))
+
+    return user.reputation_points
+
+def award_many(events):
+    """
+    Record many awards, for one user or several, with a single history
+    insert and a single UPDATE of the users' points and counters. Each
+    event is a dict of the keyword arguments award_reputation_points takes,
+    naming the user by ``user`` or ``user_id``. Returns the increments
+    applied per user id.
+    """
+    if not events:
+        return {}
+    history, totals = [], {}
+    for event in events:
+        user = event.get('user')
+        user_id = user.pk if user is not None else event['user_id']
+        history.append(ReputationHistory(
+            user_id=user_id,
+            action=event['action'],
+            points_earned=event['points'],
+            description=event['description'],
+            related_item_id=event.get('related_item_id'),
+            related_item_type=event.get('related_item_type'),
+        ))
+        updates = totals.setdefault(user_id, {})
+        for field, amount in award_increments(event['action'], event['points']).items():
+            updates[field] = updates.get(field, 0) + amount
+
+    with transaction.atomic():
+        ReputationHistory.objects.bulk_create(history)
+        User.objects.filter(pk__in=totals).update(updated_at=timezone.now(), **grouped_increments(totals))
+
+    # The callers' instances reload the updated fields on next access
+    for event in events:
+        if event.get('user') is not None:
+            for field in totals[event['user'].pk]:
+                event['user'].__dict__.pop(field, None)
+    return totals
+
+def grouped_increments(totals):
+    """``update()`` kwargs adding each user's own amounts to their row"""
+    fields = sorted({field for updates in totals.values() for field in updates})
+    if len(totals) == 1:
+        (updates,) = totals.values()
+        return {field: F(field) + updates[field] for field in fields}
+    return {
+        field: F(field) + Case(
+            *[When(pk=user_id, then=Value(updates.get(field, 0))) for user_id, updates in totals.items()],
+            default=Value(0),
+        )
+        for field in fields
+    }
 
 def get_reputation_points_for_action(action):
     """
@@ -26,6 +26,7 @@ from .utils import award_reputation_points, calculate_user_trust_score
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from rest_framework.decorators import api_view, permission_classes
+from core import conditional
 
 # Create your views here.
 
@@ -153,8 +154,16 @@ class PublicUserView(generics.RetrieveAPIView):
     serializer_class = PublicUserSerializer
     queryset = User.objects.all()
     
+    # User has no updated_at, so the ETag covers every field the response shows
+    validator_fields = ('email', 'first_name', 'last_name', 'reputation_points',
+                        'total_items_shared', 'successful_transactions')
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        validators = conditional.fingerprint_validators(request, instance, self.validator_fields)
+        response = conditional.not_modified(request, validators)
+        if response is not None:
+            return response
         serializer = self.get_serializer(instance)
         data = serializer.data
         
@@ -162,4 +171,4 @@ class PublicUserView(generics.RetrieveAPIView):
         trust_score = calculate_user_trust_score(instance)
         data['trust_score'] = round(trust_score, 1)
         
-        return Response(data)
\ No newline at end of file
+        return conditional.add_validator_headers(Response(data), validators)
\ No newline at end of file
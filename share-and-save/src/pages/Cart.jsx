@@ -103,9 +103,11 @@ const Cart = () => {
                       <FaMinus />
                     </button>
                     <span className="w-8 text-center">{item.quantity}</span>
+                    {/* Free and discount listings are single items */}
                     <button
                       onClick={() => updateQuantity(item.id, item.quantity + 1)}
-                      className="p-1 text-gray-500 hover:text-orange-500"
+                      disabled={item.item_type !== 'food'}
+                      className="p-1 text-gray-500 hover:text-orange-500 disabled:opacity-30 disabled:hover:text-gray-500"
                     >
                       <FaPlus />
                     </button>
@@ -17,10 +17,20 @@ const DiscountProducts = () => {
   const [distance, setDistance] = useState('');
   const [showAuthModal, setShowAuthModal] = useState(false);
   const [products, setProducts] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const { addToCart } = useCart();
 
+  const authHeaders = () => {
+    const headers = {};
+    if (isAuthenticated && token) {
+      headers['Authorization'] = `Bearer ${token}`;
+    }
+    return headers;
+  };
+
   const fetchProducts = async (searchParams = {}) => {
     try {
       setLoading(true);
@@ -31,16 +41,12 @@ const DiscountProducts = () => {
         ...(searchParams.location ? { location: searchParams.location } : {})
       });
 
-      const headers = {};
-      if (isAuthenticated && token) {
-        headers['Authorization'] = `Bearer ${token}`;
-      }
-
       const response = await axios.get(
         `http://localhost:8000/api/discount-products/?${params}`,
-        { headers }
+        { headers: authHeaders() }
       );
-      setProducts(response.data);
+      setProducts(response.data.results);
+      setNextUrl(response.data.next);
     } catch (error) {
       console.error('Error fetching products:', error);
       setError('Failed to fetch products. Please try again later.');
@@ -49,6 +55,27 @@ const DiscountProducts = () => {
     }
   };
 
+  // Follows the next cursor and appends that page
+  const loadMore = async () => {
+    if (!nextUrl || loadingMore) {
+      return;
+    }
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(nextUrl, { headers: authHeaders() });
+      setProducts(prev => {
+        const listed = new Set(prev.map(product => product.id));
+        return [...prev, ...response.data.results.filter(product => !listed.has(product.id))];
+      });
+      setNextUrl(response.data.next);
+    } catch (error) {
+      console.error('Error loading more products:', error);
+      setError('Failed to load more products. Please try again later.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Debounced search functions
   const debouncedSearch = useCallback(
     debounce((searchTerm) => {
@@ -327,6 +354,19 @@ const DiscountProducts = () => {
             ))}
           </div>
         )}
+
+        {/* Load More */}
+        {!loading && nextUrl && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-blue-600 hover:bg-blue-700 disabled:opacity-50 text-white font-semibold py-3 px-8 rounded-lg transition-colors"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Authentication Modal */}
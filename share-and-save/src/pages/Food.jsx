@@ -12,6 +12,8 @@ const Food = () => {
   const { isAuthenticated, token, user } = useAuth();
   const { addToCart } = useCart();
   const [foodItems, setFoodItems] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
@@ -20,6 +22,14 @@ const Food = () => {
   const [showFreeOnly, setShowFreeOnly] = useState(false);
   const [showAuthModal, setShowAuthModal] = useState(false);
 
+  const authHeaders = useCallback(() => {
+    const headers = {};
+    if (isAuthenticated && token) {
+      headers['Authorization'] = `Bearer ${token}`;
+    }
+    return headers;
+  }, [isAuthenticated, token]);
+
   const fetchFoodItems = useCallback(async (searchParams = {}) => {
     try {
       setLoading(true);
@@ -30,16 +40,12 @@ const Food = () => {
         ...(searchParams.location ? { location: searchParams.location } : {})
       });
 
-      const headers = {};
-      if (isAuthenticated && token) {
-        headers['Authorization'] = `Bearer ${token}`;
-      }
-
       const response = await axios.get(
         `http://localhost:8000/api/food/?${params}`,
-        { headers }
+        { headers: authHeaders() }
       );
-      setFoodItems(response.data);
+      setFoodItems(response.data.results);
+      setNextUrl(response.data.next);
       setError('');
     } catch (error) {
       console.error('Error fetching food items:', error);
@@ -47,7 +53,28 @@ const Food = () => {
     } finally {
       setLoading(false);
     }
-  }, [selectedCategory, showFreeOnly, isAuthenticated, token]);
+  }, [selectedCategory, showFreeOnly, authHeaders]);
+
+  // Follows the next cursor and appends that page
+  const loadMore = async () => {
+    if (!nextUrl || loadingMore) {
+      return;
+    }
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(nextUrl, { headers: authHeaders() });
+      setFoodItems(prev => {
+        const listed = new Set(prev.map(item => item.id));
+        return [...prev, ...response.data.results.filter(item => !listed.has(item.id))];
+      });
+      setNextUrl(response.data.next);
+    } catch (error) {
+      console.error('Error loading more food items:', error);
+      alert('Failed to load more food items. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   // Create memoized debounced search functions
   const debouncedSearch = useCallback(
@@ -343,6 +370,19 @@ const Food = () => {
             ))}
           </div>
         )}
+
+        {/* Load More */}
+        {!loading && nextUrl && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-orange-600 hover:bg-orange-700 disabled:opacity-50 text-white font-semibold py-3 px-8 rounded-lg transition-colors"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
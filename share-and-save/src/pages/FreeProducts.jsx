@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { MagnifyingGlassIcon, PlusIcon, MapPinIcon, TagIcon } from '@heroicons/react/24/solid';
 import { FaTrash } from 'react-icons/fa';
@@ -16,13 +16,29 @@ const FreeProducts = () => {
   const [category, setCategory] = useState('');
   const [condition, setCondition] = useState('');
   const [products, setProducts] = useState([]);
+  const [moreProducts, setMoreProducts] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const loadedMore = useRef(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [showAuthModal, setShowAuthModal] = useState(false);
 
-  const fetchProducts = async (searchParams = {}) => {
+  const authHeaders = () => {
+    const headers = {};
+    if (isAuthenticated && token) {
+      headers['Authorization'] = `Bearer ${token}`;
+    }
+    return headers;
+  };
+
+  // Fetches the first page. A refresh re-polls it in place and keeps any
+  // pages loaded below it with "Load more".
+  const fetchProducts = async (searchParams = {}, { refresh = false } = {}) => {
     try {
-      setLoading(true);
+      if (!refresh) {
+        setLoading(true);
+      }
       const params = new URLSearchParams({
         ...(searchParams.category || category ? { category: searchParams.category || category } : {}),
         ...(searchParams.condition || condition ? { condition: searchParams.condition || condition } : {}),
@@ -30,16 +46,16 @@ const FreeProducts = () => {
         ...(searchParams.location ? { location: searchParams.location } : {})
       });
 
-      const headers = {};
-      if (isAuthenticated && token) {
-        headers['Authorization'] = `Bearer ${token}`;
-      }
-
       const response = await axios.get(
         `http://localhost:8000/api/free-products/?${params}`,
-        { headers }
+        { headers: authHeaders() }
       );
-      setProducts(response.data);
+      setProducts(response.data.results);
+      if (!refresh || !loadedMore.current) {
+        loadedMore.current = false;
+        setMoreProducts([]);
+        setNextUrl(response.data.next);
+      }
     } catch (error) {
       console.error('Error fetching products:', error);
       setError('Failed to fetch products. Please try again later.');
@@ -48,6 +64,29 @@ const FreeProducts = () => {
     }
   };
 
+  // Follows the next cursor and appends that page
+  const loadMore = async () => {
+    if (!nextUrl || loadingMore) {
+      return;
+    }
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(nextUrl, { headers: authHeaders() });
+      loadedMore.current = true;
+      setMoreProducts(prev => [...prev, ...response.data.results]);
+      setNextUrl(response.data.next);
+    } catch (error) {
+      console.error('Error loading more products:', error);
+      setError('Failed to load more products. Please try again later.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // First page, then loaded pages minus anything a re-poll moved onto the first page
+  const firstPageIds = new Set(products.map(product => product.id));
+  const listedProducts = [...products, ...moreProducts.filter(product => !firstPageIds.has(product.id))];
+
   // Debounced search functions
   const debouncedSearch = useCallback(
     debounce((searchTerm) => {
@@ -96,7 +135,7 @@ const FreeProducts = () => {
   // Add a new useEffect to handle navigation
   useEffect(() => {
     const handleFocus = () => {
-      fetchProducts();
+      fetchProducts({}, { refresh: true });
     };
 
     window.addEventListener('focus', handleFocus);
@@ -121,7 +160,7 @@ const FreeProducts = () => {
   useEffect(() => {
     const handlePopState = () => {
       console.log('Navigation occurred, refreshing products');
-      fetchProducts();
+      fetchProducts({}, { refresh: true });
     };
 
     window.addEventListener('popstate', handlePopState);
@@ -135,7 +174,7 @@ const FreeProducts = () => {
     const handleVisibilityChange = () => {
       if (document.visibilityState === 'visible') {
         console.log('Page became visible, refreshing products');
-        fetchProducts();
+        fetchProducts({}, { refresh: true });
       }
     };
 
@@ -149,7 +188,7 @@ const FreeProducts = () => {
   useEffect(() => {
     const interval = setInterval(() => {
       console.log('Periodic refresh, fetching products');
-      fetchProducts();
+      fetchProducts({}, { refresh: true });
     }, 30000); // Refresh every 30 seconds
 
     return () => {
@@ -209,6 +248,7 @@ const FreeProducts = () => {
       });
       // Remove the deleted product from the state
       setProducts(products.filter(product => product.id !== productId));
+      setMoreProducts(moreProducts.filter(product => product.id !== productId));
     } catch (error) {
       console.error('Error deleting product:', error);
       alert('Failed to delete product. Please try again.');
@@ -308,12 +348,12 @@ const FreeProducts = () => {
         ) : (
           /* Product Cards */
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-            {products.length === 0 ? (
+            {listedProducts.length === 0 ? (
               <div className="col-span-full text-center py-12">
                 <p className="text-gray-600 text-lg">No free products found. Be the first to list one!</p>
               </div>
             ) : (
-              products.map(product => (
+              listedProducts.map(product => (
                 <div 
                   key={product.id} 
                   className="bg-white rounded-xl shadow-lg overflow-hidden transform transition-all hover:scale-105 hover:shadow-xl"
@@ -374,6 +414,19 @@ const FreeProducts = () => {
             )}
           </div>
         )}
+
+        {/* Load More */}
+        {!loading && nextUrl && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-green-600 hover:bg-green-700 disabled:opacity-50 text-white font-semibold py-3 px-8 rounded-lg transition-colors"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Authentication Modal */}